@@ -0,0 +1,76 @@
+import sys
+import os
+import os.path
+import pygame
+
+TILE_W, TILE_H = 40, 60
+# Every face in the atlas, left to right.
+KEYS = list(range(1, 16)) + ['template']
+
+def face_path(key):
+  return os.path.abspath('res/tiles/' + str(key) + '.png')
+
+ATLAS_PATH = os.path.abspath('res/tiles/atlas.png')
+
+class TileAtlas:
+  "All tile faces and the blank template packed side by side in one surface. \
+   Faces are handed out as areas of that surface (or subsurfaces of it), so \
+   drawing a board blits from a single texture and never touches the disk."
+  def __init__(self, surface):
+    self.surface   = surface
+    self.areas     = {}
+    self.images    = {}
+    self.converted = False
+    for i, key in enumerate(KEYS):
+      self.areas[key] = pygame.Rect(i * TILE_W, 0, TILE_W, TILE_H)
+    self._subsurfaces()
+
+  def _subsurfaces(self):
+    for key, area in self.areas.items():
+      self.images[key] = self.surface.subsurface(area)
+
+  @classmethod
+  def build(cls):
+    "Packs the separate face PNGs into a new atlas."
+    surface = pygame.Surface((TILE_W * len(KEYS), TILE_H), pygame.SRCALPHA, 32)
+    for i, key in enumerate(KEYS):
+      surface.blit(pygame.image.load(face_path(key)), (i * TILE_W, 0))
+    return cls(surface)
+
+  @classmethod
+  def load(cls):
+    "Reads the prebuilt atlas if it is newer than every face, otherwise \
+     builds one from the faces."
+    try:
+      built = os.path.getmtime(ATLAS_PATH)
+      if all(os.path.getmtime(face_path(key)) <= built for key in KEYS):
+        return cls(pygame.image.load(ATLAS_PATH))
+    except (OSError, pygame.error):
+      pass
+    return cls.build()
+
+  def convert(self):
+    "Converts the atlas to the display's pixel format, once there is a display."
+    if not self.converted and pygame.display.get_surface():
+      self.surface = self.surface.convert_alpha()
+      self._subsurfaces()
+      self.converted = True
+
+  def area(self, key):
+    return self.areas[key]
+
+  def image(self, key):
+    return self.images[key]
+
+  def save(self, path=ATLAS_PATH):
+    pygame.image.save(self.surface, path)
+
+def main():
+  "Usage: atlas.py \
+   Writes res/tiles/atlas.png from the separate tile faces."
+  atlas = TileAtlas.build()
+  atlas.save()
+  print ('Wrote ' + ATLAS_PATH)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import subprocess
+
+# Benchmarks run without a window or sound card.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from tile import *
+from board import *
+from hittest import *
+from deal import *
+from game import *
+
+FONT_PATH = 'res/C_BOX.TTF'
+
+def best_of(fn, repeat=5, number=1):
+  "Seconds per call of fn(), the best of 'repeat' runs of 'number' calls."
+  best = None
+  for r in range(repeat):
+    started = time.perf_counter()
+    for n in range(number):
+      fn()
+    elapsed = (time.perf_counter() - started) / number
+    if best is None or elapsed < best:
+      best = elapsed
+  return best
+
+def run(fn):
+  "Runs one benchmark, recording why it could not run instead of failing."
+  try:
+    return fn()
+  except Exception as e:
+    return {'error': '%s: %s' % (type(e).__name__, e)}
+
+def bench_board(tiles, repeat):
+  results = {'tiles': len(tiles)}
+  rnd = random.Random(1)
+
+  results['shuffle_tiles'] = best_of(lambda: shuffle_tiles(list(tiles), rnd), repeat)
+  results['board_build'] = best_of(lambda: Board(tiles), repeat)
+
+  # The scalar check is O(n) per tile, so big boards are sampled.
+  sample = tiles if len(tiles) <= 500 else rnd.sample(tiles, 500)
+  per_call = best_of(lambda: [tile.is_blocked(tiles) for tile in sample], repeat) / len(sample)
+  results['tile_is_blocked_per_call'] = per_call
+  results['tile_is_blocked_full_board'] = per_call * len(tiles)
+
+  board = Board(tiles)
+  results['board_is_blocked_full_board'] = best_of(lambda: [board.is_blocked(tile) for tile in tiles], repeat)
+
+  hits = HitGrid(tiles)
+  points = [(rnd.randint(0, 799), rnd.randint(0, 599)) for i in range(1000)]
+  results['hit_test_per_click'] = best_of(lambda: [hits.pick(x, y) for x, y in points], repeat) / len(points)
+  results['hit_grid_build'] = best_of(lambda: HitGrid(tiles), repeat)
+  return results
+
+def bench_vectorized(tiles, repeat):
+  import vectorized
+  if vectorized.numpy is None:
+    return {'error': 'numpy is not installed'}
+
+  # Cross-check against Tile.is_blocked before timing, on a sample for big
+  # boards since the scalar side is O(n^2).
+  checked = tiles if len(tiles) <= 2000 else tiles[:2000]
+  results = {'vectorized_matches_scalar': not vectorized.check_against_scalar(checked)}
+  results['vectorized_blocked_full_board'] = best_of(lambda: vectorized.tiles_blocked_mask(tiles), repeat)
+  return results
+
+def bench_render(game, screen, tiles, repeat):
+  game.state = 'playing'
+  game.core = GameState(tiles, now=pygame.time.get_ticks())
+  game.tiles = game.core.board
+  game.hits = HitGrid(game.tiles)
+  game.selected = None
+
+  def full_frame():
+    game.renderer.invalidate()
+    game.render(screen)
+
+  results = {}
+  results['render_playing_full'] = best_of(full_frame, repeat)
+  game.render(screen)
+  results['render_playing_idle'] = best_of(lambda: game.render(screen), repeat, number=10)
+  return results
+
+def bench_editor(tiles, repeat):
+  from editor import Editor
+  # Only the occupancy grid is needed, so it is built on a bare Editor
+  # instead of going through Game.__init__, which would load (and create) a
+  # level file under levels/.
+  editor = Editor.__new__(Editor)
+  editor.stacks = {}
+  editor.tops   = {}
+  for tile in tiles:
+    editor.add_to_grid(tile)
+  cursor = Tile(1, 0, 0, 1)
+  rnd = random.Random(2)
+  spots = [(rnd.randint(0, 39) * 20, rnd.randint(0, 19) * 30) for i in range(1000)]
+
+  def lookups():
+    for cursor.x, cursor.y in spots:
+      editor.getNearestBelow(cursor)
+  return {'editor_nearest_below': best_of(lookups, repeat) / len(spots)}
+
+def commit():
+  try:
+    return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT).decode().strip()
+  except Exception:
+    return None
+
+def main():
+  "Usage: bench.py [--out FILE] [--sizes 1000,5000,10000] [--repeat N] \
+   Times the board logic and rendering hot paths for every shipped level and \
+   for synthetic layouts of the given sizes, and prints the results as JSON."
+  args = sys.argv[1:]
+  out, sizes, repeat = None, [1000, 5000, 10000], 5
+  if '--out' in args:
+    out = args[args.index('--out')+1]
+  if '--sizes' in args:
+    sizes = [int(size) for size in args[args.index('--sizes')+1].split(',')]
+  if '--repeat' in args:
+    repeat = int(args[args.index('--repeat')+1])
+
+  pygame.init()
+  screen = pygame.display.set_mode((800,600))
+  game = run(lambda: Game(sound=False))
+  if isinstance(game, Game) and not os.path.exists(FONT_PATH):
+    # The menu font is not shipped with every checkout; the default font
+    # renders the HUD just as well for timing purposes.
+    game.resources.loaders['font'] = lambda: pygame.font.Font(None, 30)
+
+  layouts = {}
+  catalog = LevelCatalog()
+  for level in catalog.levels():
+    results = {}
+    results['load_level'] = best_of(lambda: load_level(level), repeat)
+    results['load_level_dealt'] = best_of(lambda: load_level(level, rnd=True, seed=0), repeat)
+    layouts[level] = (load_level(level, rnd=True, seed=0), results)
+  for size in sizes:
+    layouts['synthetic_%d' % size] = (synthetic_layout(size), {})
+
+  report = { 'commit'   : commit(),                 \
+             'python'   : platform.python_version(), \
+             'pygame'   : pygame.version.ver,        \
+             'repeat'   : repeat,                    \
+             'layouts'  : {}                         \
+  }
+  for name, (tiles, results) in layouts.items():
+    results['board'] = run(lambda: bench_board(tiles, repeat))
+    results['vectorized'] = run(lambda: bench_vectorized(tiles, repeat))
+    if isinstance(game, Game):
+      results['render'] = run(lambda: bench_render(game, screen, tiles, repeat))
+    else:
+      results['render'] = game
+    results['editor'] = run(lambda: bench_editor(tiles, repeat))
+    report['layouts'][name] = results
+
+  text = json.dumps(report, indent=2, sort_keys=True)
+  if out:
+    with open(out, 'w') as fh:
+      fh.write(text)
+  print (text)
+
+if __name__ == "__main__":
+  main()
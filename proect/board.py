@@ -0,0 +1,140 @@
+from tile import *
+
+# Offsets of the cells that cover a tile when they hold a tile with a higher z.
+COVER_OFFSETS = [(dx, dy) for dx in (-20, 0, 20) for dy in (-30, 0, 30)]
+# Offsets of the cells that count as a direct left/right neighbour on the same z.
+SIDE_OFFSETS = (-30, 0, 30)
+
+def bits(mask):
+  "Yields the indexes of the set bits in 'mask', lowest first."
+  while mask:
+    low = mask & -mask
+    yield low.bit_length() - 1
+    mask ^= low
+
+class Board:
+  "A collection of tiles keyed by their (x, y, z) grid cell. The board keeps \
+   the set of free (unblocked) tiles up to date as tiles are removed or added, \
+   so asking whether a tile is blocked never scans the whole layout."
+  def __init__(self, tiles=()):
+    self.cells   = {}     # (x, y, z) -> tile, in draw order
+    self.columns = {}     # (x, y)    -> list of occupied z levels
+    self.free    = set()
+    self.free_by_no = {}  # tileno -> set of free tiles with that number
+    self.matchable  = set()  # tile numbers with at least two free tiles
+
+    for tile in tiles:
+      self._insert(tile)
+    for tile in self.cells.values():
+      self._refresh(tile)
+
+  def __iter__(self):
+    return iter(list(self.cells.values()))
+
+  def __len__(self):
+    return len(self.cells)
+
+  def __contains__(self, tile):
+    return self.cells.get((tile.x, tile.y, tile.z)) is tile
+
+  def tile_at(self, x, y, z):
+    return self.cells.get((x, y, z))
+
+  def is_blocked(self, tile):
+    "Same answer as Tile.is_blocked(tiles), but looked up instead of computed."
+    return tile not in self.free
+
+  def free_tiles(self):
+    return list(self.free)
+
+  def count_free(self):
+    return len(self.free)
+
+  def free_groups(self):
+    "Lists of free tiles sharing a number, for every number with a pair free."
+    return [sorted(self.free_by_no[tileno], key=byTopRight) for tileno in sorted(self.matchable)]
+
+  def has_moves(self):
+    "Whether any pair can be removed right now."
+    return bool(self.matchable)
+
+  def hint(self):
+    "A removable pair of tiles, or None when the board is stuck."
+    for tileno in self.matchable:
+      group = iter(self.free_by_no[tileno])
+      return next(group), next(group)
+    return None
+
+  def add(self, tile):
+    self._insert(tile)
+    self._refresh(tile)
+    for neighbour in self._neighbours(tile):
+      self._refresh(neighbour)
+
+  def remove(self, tile):
+    del self.cells[(tile.x, tile.y, tile.z)]
+    column = self.columns[(tile.x, tile.y)]
+    column.remove(tile.z)
+    if not column:
+      del self.columns[(tile.x, tile.y)]
+    self._set_free(tile, False)
+
+    for neighbour in self._neighbours(tile):
+      self._refresh(neighbour)
+
+  def remove_pair(self, a, b):
+    self.remove(a)
+    self.remove(b)
+
+  def _insert(self, tile):
+    self.cells[(tile.x, tile.y, tile.z)] = tile
+    self.columns.setdefault((tile.x, tile.y), []).append(tile.z)
+
+  def _neighbours(self, tile):
+    "Tiles whose blocked state may depend on 'tile': the ones it covers and \
+     the ones it sits beside on the same level."
+    x, y, z = tile.x, tile.y, tile.z
+    for dx, dy in COVER_OFFSETS:
+      for below in self.columns.get((x + dx, y + dy), ()):
+        if below < z:
+          yield self.cells[(x + dx, y + dy, below)]
+    for dx in (-40, 40):
+      for dy in SIDE_OFFSETS:
+        side = self.cells.get((x + dx, y + dy, z))
+        if side:
+          yield side
+
+  def _covered(self, tile):
+    x, y, z = tile.x, tile.y, tile.z
+    for dx, dy in COVER_OFFSETS:
+      column = self.columns.get((x + dx, y + dy))
+      if column and max(column) > z:
+        return True
+    return False
+
+  def _has_side(self, tile, dx):
+    x, y, z = tile.x, tile.y, tile.z
+    for dy in SIDE_OFFSETS:
+      if (x + dx, y + dy, z) in self.cells:
+        return True
+    return False
+
+  def _refresh(self, tile):
+    blocked = self._covered(tile) or (self._has_side(tile, -40) and self._has_side(tile, 40))
+    self._set_free(tile, not blocked)
+
+  def _set_free(self, tile, free):
+    if free == (tile in self.free):
+      return
+    group = self.free_by_no.setdefault(tile.tileno, set())
+    if free:
+      self.free.add(tile)
+      group.add(tile)
+    else:
+      self.free.discard(tile)
+      group.discard(tile)
+
+    if len(group) >= 2:
+      self.matchable.add(tile.tileno)
+    else:
+      self.matchable.discard(tile.tileno)
@@ -0,0 +1,129 @@
+import sys
+import os
+import os.path
+import time
+import json
+
+from levelfile import *
+
+class LevelInfo:
+  "What the menus and tools need to know about a level without loading it."
+  def __init__(self, name, path, records, has_scores, stamp):
+    self.name  = name
+    self.path  = path
+    self.stamp = stamp         # [mtime_ns, size] of the file when it was read
+    self.tiles = len(records)
+    if records:
+      xs = [r[1] for r in records]
+      ys = [r[2] for r in records]
+      self.bbox  = (min(xs), min(ys), max(xs) + 40, max(ys) + 60)
+      self.max_z = max(r[3] for r in records)
+    else:
+      self.bbox  = (0, 0, 0, 0)
+      self.max_z = 0
+    self.has_scores = has_scores
+
+class LevelCatalog:
+  "Scans the levels directory once and serves the list of levels and their \
+   metadata from memory. At most every 'interval' seconds the directories' \
+   mtimes are polled, and only then is anything re-read."
+  def __init__(self, root='levels/', interval=2.0):
+    self.root       = os.path.abspath(root)
+    self.scoresroot = os.path.join(self.root, 'scores')
+    self.ratings_path = os.path.join(self.root, '.ratings.json')
+    self.interval   = interval
+    self.checked    = None
+    self.stamp      = None
+    self.names      = []
+    self.scores     = []
+    self.infos      = {}
+    self.ratings    = None
+
+  def _stamp(self):
+    stamp = []
+    for path in (self.root, self.scoresroot):
+      try:
+        stamp.append(os.stat(path).st_mtime_ns)
+      except OSError:
+        stamp.append(None)
+    return tuple(stamp)
+
+  def _files(self, path):
+    try:
+      names = os.listdir(path)
+    except OSError:
+      return []
+    return sorted(name for name in names if not name.startswith('.') and \
+                  not name.endswith('.tmp') and os.path.isfile(os.path.join(path, name)))
+
+  def refresh(self, force=False):
+    "Rescans if the directories changed since the last scan. Cheap to call \
+     often; the directories are only stat'ed once per interval."
+    now = time.time()
+    if not force and self.checked is not None and now - self.checked < self.interval:
+      return
+    self.checked = now
+
+    stamp = self._stamp()
+    if not force and stamp == self.stamp:
+      return
+    self.stamp = stamp
+
+    self.names  = self._files(self.root)
+    self.scores = self._files(self.scoresroot)
+    self.infos  = {}
+    self.ratings = None
+
+  def levels(self):
+    self.refresh()
+    return self.names
+
+  def score_files(self):
+    self.refresh()
+    return self.scores
+
+  def info(self, name):
+    "Metadata for one level, read on first use. read_level keeps the parsed \
+     layout cached, so this stays cheap after a rescan."
+    self.refresh()
+    if name not in self.infos:
+      path = os.path.join(self.root, name)
+      try:
+        st = os.stat(path)
+        stamp = [st.st_mtime_ns, st.st_size]
+      except OSError:
+        stamp = None
+      self.infos[name] = LevelInfo(name, path, read_level(path), name in self.scores, stamp)
+    return self.infos[name]
+
+  def rating(self, name):
+    "The cached validation report entry for a level (see validate.py), or \
+     None if it was never rated or changed since. The entry is checked \
+     against the stamp taken when the level was scanned, so this touches the \
+     disk no more often than the catalog rescans."
+    self.refresh()
+    if self.ratings is None:
+      try:
+        with open(self.ratings_path, 'r') as fh:
+          self.ratings = json.load(fh).get('levels', {})
+      except (IOError, ValueError):
+        self.ratings = {}
+
+    entry = self.ratings.get(name)
+    if not entry:
+      return None
+    if entry.get('stamp') != self.info(name).stamp:
+      return None
+    return entry
+
+def main():
+  "Usage: catalog.py \
+   Lists every level with its tile count, bounding box and height."
+  catalog = LevelCatalog()
+  for name in catalog.levels():
+    info = catalog.info(name)
+    print ('%-20s %5d tiles  bbox %s  max z %d  %s' % \
+           (name, info.tiles, info.bbox, info.max_z, info.has_scores and 'scores' or ''))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,83 @@
+from tile import *
+from board import *
+from journal import *
+
+class GameState:
+  "The rules of a game in progress, with no pygame in sight: the board, the \
+   legal moves, removing and undoing pairs, and the timer. Times are plain \
+   milliseconds passed in by the caller, so a simulation can run its own \
+   clock and the pygame Game passes pygame.time.get_ticks()."
+  def __init__(self, tiles=(), now=0, board=None):
+    "Plays 'tiles' on a Board, or any board with the same interface (such \
+     as a PackedBoard) when one is given."
+    self.board = board if board is not None else Board(tiles)
+    self.start_piece_count = len(self.board)
+    self.journal   = Journal()   # removed pairs, undoable and redoable
+    self.started   = now
+    self.paused_at = None
+
+  @property
+  def pieces_removed(self):
+    return self.start_piece_count - len(self.board)
+
+  def legal_moves(self):
+    "Every pair that can be removed right now."
+    moves = []
+    for group in self.board.free_groups():
+      for i, a in enumerate(group):
+        for b in group[i+1:]:
+          moves.append((a, b))
+    return moves
+
+  def can_remove(self, a, b):
+    return a != b and a.tileno == b.tileno and \
+           a in self.board and b in self.board and \
+           not self.board.is_blocked(a) and not self.board.is_blocked(b)
+
+  def remove(self, a, b):
+    "Removes a pair if the rules allow it. Returns whether it did."
+    if not self.can_remove(a, b):
+      return False
+    self.board.remove_pair(a, b)
+    self.journal.record((REMOVE, a, b))
+    return True
+
+  def undo(self):
+    "Puts the last removed pair back and returns it, or None."
+    delta = self.journal.undo()
+    if delta is None:
+      return None
+    op, a, b = delta
+    self.board.add(b)
+    self.board.add(a)
+    return a, b
+
+  def redo(self):
+    "Removes the last pair put back by undo again and returns it, or None."
+    delta = self.journal.redo()
+    if delta is None:
+      return None
+    op, a, b = delta
+    self.board.remove_pair(a, b)
+    return a, b
+
+  def is_won(self):
+    return len(self.board) == 0
+
+  def is_stuck(self):
+    return len(self.board) > 0 and not self.board.has_moves()
+
+  def pause(self, now):
+    if self.paused_at is None:
+      self.paused_at = now
+
+  def resume(self, now):
+    if self.paused_at is not None:
+      self.started += now - self.paused_at
+      self.paused_at = None
+
+  def elapsed(self, now):
+    "Milliseconds played, not counting time spent paused."
+    if self.paused_at is not None:
+      now = self.paused_at
+    return now - self.started
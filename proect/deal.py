@@ -0,0 +1,66 @@
+import random
+
+from tile import *
+from board import *
+
+def synthetic_layout(count, seed=0):
+  "A layout of 'count' tiles: staggered layers of a 19 x 7 grid, each layer \
+   shifted by half a tile, with random tile numbers in pairs."
+  rnd = random.Random(seed)
+  cols, rows = 19, 7
+  tiles = []
+  for i in range(count):
+    layer, cell = divmod(i, cols * rows)
+    row, col = divmod(cell, cols)
+    x = 20 + col * 40 + (layer % 2) * 20
+    y = 90 + row * 60 + (layer % 2) * 30
+    tiles.append(Tile(0, x, y, layer + 1))
+  for i in range(0, count, 2):
+    no = rnd.randint(1, 15)
+    for tile in tiles[i:i+2]:
+      tile.tileno = no
+  return tiles
+
+class DealError(ValueError):
+  "No deal that can be cleared was found for a layout."
+
+def generate_deal(tiles, seed=None, kinds=15, attempts=50, strict=False):
+  "Gives the positions in 'tiles' tile numbers so that the deal can always be \
+   cleared. Play is simulated on a Board: two free positions get the same \
+   number and are taken off, until nothing is left. Read backwards that is \
+   the order the pairs were laid down in, so the removal order is a solution. \
+   If every attempt gets stuck (the layout jams, e.g. tiles stacked so that \
+   too few are ever free) the deal can NOT be promised solvable: with strict \
+   set a DealError is raised, otherwise a warning is printed and the tiles \
+   still unnumbered are paired up at random, so the game can at least start."
+  rnd = random.Random(seed)
+  numbers = {}
+  for attempt in range(attempts):
+    board = Board([Tile(0, tile.x, tile.y, tile.z) for tile in tiles])
+    numbers = {}
+    while len(board) > 1:
+      free = sorted(board.free_tiles(), key=byTopRight)
+      if len(free) < 2:
+        break
+      a, b = rnd.sample(free, 2)
+      no = rnd.randint(1, kinds)
+      numbers[(a.x, a.y, a.z)] = no
+      numbers[(b.x, b.y, b.z)] = no
+      board.remove_pair(a, b)
+
+    if len(board) < 2:
+      break
+  else:
+    if strict:
+      raise DealError('no solvable deal found in %d attempts (%d tiles stuck)' % (attempts, len(board)))
+    print ('Warning: no solvable deal found in %d attempts, %d tiles are dealt at random.' % (attempts, len(board)))
+
+  # An odd tile out, or a failed deal: pair up whatever is left at random.
+  left = [tile for tile in tiles if not (tile.x, tile.y, tile.z) in numbers]
+  rnd.shuffle(left)
+  for i in range(0, len(left), 2):
+    no = rnd.randint(1, kinds)
+    for tile in left[i:i+2]:
+      numbers[(tile.x, tile.y, tile.z)] = no
+
+  return [Tile(numbers[(tile.x, tile.y, tile.z)], tile.x, tile.y, tile.z) for tile in tiles]
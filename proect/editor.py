@@ -5,24 +5,47 @@ import os.path
 
 from tile import *
 from game import * 
+from board import *
+from journal import *
 
 class Editor(Game):
   def __init__(self,sound=True, filename=None):
     Game.__init__(self,editor=True, sound=sound, filename=filename)
     self.cursor_tile = Tile(1,0,0,1)
+
+    # Occupancy grid: (x, y) snap cell -> tiles placed in it, in placement
+    # order, and the height map: cell -> its highest tile.
+    self.stacks = {}
+    self.tops   = {}
+    for tile in self.tiles:
+      self.add_to_grid(tile)
+
+    # Every tile in self.tiles was placed by a recorded move, the ones loaded
+    # from the file included, so undo can take them away again.
+    self.journal = Journal()
+    for tile in self.tiles:
+      self.journal.record((PLACE, tile))
+
+  def add_to_grid(self, tile):
+    cell = (tile.x, tile.y)
+    self.stacks.setdefault(cell, []).append(tile)
+    if cell not in self.tops or byTopRight(tile) > byTopRight(self.tops[cell]):
+      self.tops[cell] = tile
+
+  def remove_from_grid(self, tile):
+    cell = (tile.x, tile.y)
+    stack = self.stacks[cell]
+    stack.remove(tile)
+    if stack:
+      self.tops[cell] = max(stack, key=byTopRight)
+    else:
+      del self.stacks[cell]
+      del self.tops[cell]
     
   def save_level(self):
     "Writes the current tile list to file."
-    fh = open('levels/' + self.filename, 'w')
-    if(fh):
-      for tile in self.tiles:
-        no = tile.tileno
-        x,y,z = tile.x, tile.y, tile.z
-        fh.write('('+str(no)+','+str(x)+','+str(y)+','+str(z)+')')
-        
-      print ('Saved.')
-    
-    fh.close()
+    write_level(os.path.abspath('levels/' + self.filename), self.tiles)
+    print ('Saved.')
         
   
   def select_cursor_tile(self, event):
@@ -34,11 +57,26 @@ class Editor(Game):
     if event.unicode == 's':
       self.save_level()
     if event.unicode == 'u':
-      try:
-        self.tiles.pop()
-      except IndexError as e:
-        pass
+      self.undo_place()
+    if event.unicode == 'r':
+      self.redo_place()
     return
+
+  def undo_place(self):
+    "Takes the last placed tile back off the board."
+    delta = self.journal.undo()
+    if delta:
+      op, tile = delta
+      self.tiles.pop()
+      self.remove_from_grid(tile)
+
+  def redo_place(self):
+    "Places the last tile taken back by undo again."
+    delta = self.journal.redo()
+    if delta:
+      op, tile = delta
+      self.tiles.append(tile)
+      self.add_to_grid(tile)
   
   def getNearestBelow(self, t):
     "Determines whether or not our tile 't' has a tile below it, and if it does,  \
@@ -46,24 +84,12 @@ class Editor(Game):
      our tile should be at when editing levels."
     x = t.x
     y = t.y
-    z = t.z
-    for tile in sorted(self.tiles, key=byTopRight, reverse=True):
-      if (tile.x + 20 == x and tile.y - 30 == y) or \
-         (tile.x - 20 == x and tile.y - 30 == y) or \
-         (tile.x + 20 == x and tile.y + 30 == y) or \
-         (tile.x - 20 == x and tile.y + 30 == y):
-        return tile
-      if tile.x == x and tile.y == y:
-        return tile
-      if tile.y == y and tile.x + 20 == x:
-        return tile
-      if tile.x == x and tile.y + 30 == y:
-        return tile
-      if tile.x == x and tile.y - 30 == y:
-        return tile
-      if tile.y == y and tile.x - 20 == x:
-        return tile
-    return None
+    nearest = None
+    for dx, dy in COVER_OFFSETS:
+      tile = self.tops.get((x + dx, y + dy))
+      if tile and (nearest is None or byTopRight(tile) > byTopRight(nearest)):
+        nearest = tile
+    return nearest
     
   def manual_move_tile_cursor(self, x, y):
     "Take in mouse coordinates and move around our tile cursor."
@@ -94,7 +120,10 @@ class Editor(Game):
     else:
       self.cursor_tile.z = 1
 
-    self.tiles.append(Tile(no,x,y,z))
+    tile = Tile(no,x,y,z)
+    self.tiles.append(tile)
+    self.add_to_grid(tile)
+    self.journal.record((PLACE, tile))
     self.manual_move_tile_cursor(self.cursor_tile.x, self.cursor_tile.y)
          
   def draw_tile_cursor(self, screen):
@@ -8,9 +8,22 @@ import random
 from random import shuffle
 
 from tile import *
+from board import *
+from core import *
+from hittest import *
+from deal import *
+from levelfile import *
+from catalog import *
+from scores import *
+from render import *
+from textcache import *
+from resources import *
+from replay import *
+from scale import *
 
 COLOR_BLACK = (0,0,0)
 COLOR_WHITE = (255,255,255)
+COLOR_PINK  = (255,74,203)
 def is_in(x,y, rect):
   if x >= rect[0] and x <= rect[0]+rect[2] and \
      y >= rect[1] and y <= rect[1]+rect[3]:
@@ -21,51 +34,51 @@ def is_in(x,y, rect):
 def render_black_bars(screen):
   pygame.draw.rect(screen,(0,0,0), (0,0,800,80))
   pygame.draw.rect(screen,(0,0,0), (0,520,800,80)) 
+
+def render_background(screen, viewport=None):
+  "The white play area between the black bars, scaled onto a window of \
+   another size when given its viewport."
+  if viewport is None:
+    screen.fill(COLOR_WHITE)
+    render_black_bars(screen)
+    return
+  screen.fill(COLOR_BLACK)
+  screen.fill(COLOR_WHITE, viewport.rect((0,80,800,440)))
   
+text_cache = TextCache()
+
 def get_string_surf(font, text, color=COLOR_BLACK):
   "Used in lazy-man text-writing :)"
-  return font.render(text, True, color)
+  return text_cache.get(font, text, color)
+
+def get_number_surf(font, value, color=COLOR_BLACK):
+  return text_cache.number(font, value, color)
   
-def render_text(screen, font, text, x,y,w,h, color=COLOR_BLACK):
+def render_text(screen, font, text, rect, color=COLOR_BLACK):
   "Lazy-man text-writing."
-  screen.blit(get_string_surf(font, text, color=color), (x,y,w,h))
+  return screen.blit(get_string_surf(font, text, color=color), rect)
 
-def load_level(filename, rnd=False, enforceTwo=False):
-  "Loads a level from a text file. If the random flag is set to True \
-   then all tiles are simply random, otherwise use the files data. "
-   
-  try:
-    fh = open(os.path.abspath('levels/' + filename), 'r')
-  except IOError as e:
-    open(os.path.abspath('levels/' + filename), 'a')
-  
-  fh = open(os.path.abspath('levels/' + filename), 'r')
-  if fh:
-    text = fh.read()
-    tiles = []
-    for no,x,y,z in re.findall('[(](\d+),(\d+),(\d+),(\d+)[))]', text):
-     tiles.append(Tile(int(no),int(x),int(y),int(z)))
+def load_level(filename, rnd=False, enforceTwo=False, seed=None):
+  "Loads a level file (text or binary). If the random flag is set to True \
+   then the tiles get a random deal that can always be solved (reproducible \
+   when a seed is given), otherwise use the files data. "
+  path = os.path.abspath('levels/' + filename)
+  if not os.path.exists(path):
+    open(path, 'a').close()
+
+  tiles = [Tile(no,x,y,z) for no,x,y,z in read_level(path)]
     
-    if enforceTwo and len(tiles) % 2 == 0:
-      print ('You are enforcing divisible by two tile rule, and there are an uneven amount of tiles.')
-      return []
+  if enforceTwo and len(tiles) % 2 == 1:
+    print ('You are enforcing divisible by two tile rule, and there are an uneven amount of tiles.')
+    return []
     
-    if rnd:
-      random.seed()
-      for tile in range(0,len(tiles)-1,2):
-        no = random.choice(range(1,16,1))
-        tiles[tile] = Tile(no, tiles[tile].x, tiles[tile].y, tiles[tile].z)
-        tiles[tile+1] = Tile(no, tiles[tile+1].x, tiles[tile+1].y, tiles[tile+1].z)
-      
-      
-      shuffle_tiles(tiles)
+  if rnd:
+    tiles = generate_deal(tiles, seed=seed)
     
-    return tiles
-      
-  return []
+  return tiles
   
 class Game:    
-  def __init__(self, player_name='Player', editor=False, sound=True, filename=None):
+  def __init__(self, player_name='Player', editor=False, sound=True, filename=None, record=False):
   
     # If true, editor is running, if not then 
     # we begin in the menu like normal.
@@ -77,29 +90,35 @@ class Game:
     else:
       self.state = 'menu' 
       
-    self.pieces_removed = 0                         
+    self.core = None                                
     self.selected = None                             
-    self.time_started = pygame.time.get_ticks()     
+    self.hint = None                                 
     self.m_selector = 0                             
     self.sound_on = sound                           
     self.editor = editor                            
     self.viewing_highscores_for = None              
     self.player_name = player_name                  
-
-    self.resources = { 'pause'      : pygame.image.load(os.path.abspath('res/icons/pause.png')),     \
-                       'back'       : pygame.image.load(os.path.abspath('res/icons/back.png')),      \
-                       'play'       : pygame.image.load(os.path.abspath('res/icons/play.png')),      \
-                       'sound_on'   : pygame.image.load(os.path.abspath('res/icons/sound_on.png')),  \
-                       'sound_off'  : pygame.image.load(os.path.abspath('res/icons/sound_off.png')), \
-                       'sfx_select' : pygame.mixer.Sound( os.path.abspath('res/sfx/select.wav')),    \
-                       'sfx_back'   : pygame.mixer.Sound( os.path.abspath('res/sfx/back.wav')),      \
-                       'sfx_switch' : pygame.mixer.Sound( os.path.abspath('res/sfx/switch.wav'))     \
-    }
+    self.recorder = None
+    self.replay_dir = 'replays/' if record else None
+    self.playback = False          # a replay is being shown: no scores
+
+    self.resources = Resources({ 'pause'      : load_image('res/icons/pause.png'),        \
+                                 'back'       : load_image('res/icons/back.png'),         \
+                                 'play'       : load_image('res/icons/play.png'),         \
+                                 'sound_on'   : load_image('res/icons/sound_on.png'),     \
+                                 'sound_off'  : load_image('res/icons/sound_off.png'),    \
+                                 'sfx_select' : load_sound('res/sfx/select.wav'),         \
+                                 'sfx_back'   : load_sound('res/sfx/back.wav'),           \
+                                 'sfx_switch' : load_sound('res/sfx/switch.wav'),         \
+                                 'rose'       : load_image('res/rose.jpg'),               \
+                                 'font'       : load_font('res/C_BOX.TTF', 30, bold=True) \
+    })
     
     self.render_func = { 'playing'        : self.render_playing,         \
                          'menu'           : self.render_menu,            \
                          'level_select'   : self.render_level_select,    \
                          'paused'         : self.render_paused,          \
+                         'no_moves'       : self.render_playing,         \
                          'level_complete' : self.render_level_complete,  \
                          'highscores'     : self.render_highscores       \
     }
@@ -109,45 +128,57 @@ class Game:
                             'menu'           : self.handle_menu_input,           \
                             'level_select'   : self.handle_level_select_input,   \
                             'paused'         : self.handle_paused_input,         \
+                            'no_moves'       : self.handle_no_moves_input,       \
                             'level_complete' : self.handle_level_complete_input, \
                             'highscores'     : self.handle_highscores_input      \
     }
 
     
     self.fontpath = os.path.abspath('res/C_BOX.TTF')   
-    self.font = pygame.font.Font(self.fontpath, 30, bold=True)    
+
+    self.renderer = DirtyRenderer(render_background)
+    self.viewport = None       # set when the window is not 800x600
+    self.assets   = None       # ScaledAssets for the viewport, once built
+    self.scaler   = Scaler(self.resources, ('pause', 'back', 'play', 'sound_on', 'sound_off'))
+    self.frame    = None       # 800x600 frame scaled onto the window meanwhile
+    self.catalog  = LevelCatalog()
+    self.scores   = ScoreStore()
      
-  def write_score(self):
-    "Writes player score to file for the current level they just completed. "
-    scorepath = os.path.abspath('levels/scores/' + self.filename)
-    scores = []
-    
-    try:
-      fh = open(scorepath, 'r')
-      scores = fh.read()
-      scores = re.findall('[(](\w*),(\w*)[)]', scores)
-      fh.close()
-    except IOError:
-      print ("Score file doesn't yet exist, creating...")
-      
-    scores.append((self.player_name,(pygame.time.get_ticks() - self.time_started)/1000))
-    if scores:
-      scores = sorted(scores, key=lambda s: int(s[01]))
-      
-    fh = open(scorepath, 'w')
-    i = 0
-    for score in scores:
-      fh.write('('+str(score[0])+','+str(score[1])+')')
-      if i < 4:
-        i += 1
-      else:
-        fh.close()
-        return
-        
-    fh.close()      
+  @property
+  def font(self):
+    return self.resources['font']
+
+  def preload(self):
+    "Starts loading the remaining assets in the background, while the menu \
+     is up."
+    self.resources.preload(extra=(load_tile_atlas,))
+
+  def write_score(self, now=None):
+    "Records the player's time for the level they just completed. "
+    if now is None:
+      now = pygame.time.get_ticks()
+    self.scores.add(self.filename, self.player_name, self.core.elapsed(now)/1000)
           
+  def view_key(self):
+    "What mouse movement can change on screen: the highlighted menu entry, or \
+     where the editor's tile cursor is."
+    if self.editor:
+      return (self.cursor_tile.x, self.cursor_tile.y, self.cursor_tile.z)
+    return (self.state, self.m_selector)
+
   def handle_input(self, event):
-    "Based on the games current state, manage our mouse input."
+    "Based on the games current state, manage our mouse input. Returns \
+     whether the scene may have changed; a mouse move that highlights \
+     nothing new does not need a frame."
+    if self.viewport and hasattr(event, 'pos'):
+      attrs = dict(event.__dict__)
+      attrs['pos'] = self.viewport.logical(event.pos)
+      event = pygame.event.Event(event.type, attrs)
+
+    motion = event.type == pygame.MOUSEMOTION
+    if motion:
+      before = self.view_key()
+
     if self.editor:
       if  event.type == pygame.MOUSEBUTTONDOWN:
         self.place_tile(event)
@@ -155,26 +186,86 @@ class Game:
         self.move_tile_cursor(event)
       elif event.type == pygame.KEYDOWN:
         self.select_cursor_tile(event)
-        
-      return
-    
-
-    if self.state in self.input_handlers:
+    elif self.state in self.input_handlers:
       self.input_handlers[self.state](event)
+
+    return not motion or self.view_key() != before
          
+  def next_frame_in(self):
+    "Milliseconds until the scene changes without any input (the timer \
+     ticking over to the next second), or None if it only changes on input."
+    if self.state == 'playing' and not self.editor:
+      return 1000 - self.core.elapsed(pygame.time.get_ticks()) % 1000
+    return None
+
+  def resize(self, size):
+    "Called when the window changes size. The tile faces and icons are scaled \
+     for the new size in the background; until they are ready, frames are \
+     drawn at 800x600 and scaled onto the window."
+    self.renderer.invalidate()
+    self.assets = None
+    if tuple(size) == LOGICAL_SIZE:
+      self.viewport = None
+      self.scaler.cancel()
+      return
+    self.viewport = Viewport(size)
+    if self.frame is None:
+      self.frame = pygame.Surface(LOGICAL_SIZE).convert()
+    self.assets = self.scaler.get(self.viewport, tile_atlas())
+
   def render(self, screen):
-    "Based on the games state, call the appropriate drawing methods"
+    "Based on the games state, call the appropriate drawing methods. Returns \
+     the list of screen rects that changed."
+    if self.viewport is None:
+      return self.render_frame(screen)
+
+    if self.assets is None:
+      self.assets = self.scaler.take(self.viewport)
+
+    # The board is drawn straight onto the window with the scaled surfaces,
+    # everything else at 800x600 and then scaled.
+    if self.assets and not self.editor and self.state in ('playing', 'paused', 'no_moves'):
+      self.renderer.configure(self.viewport, self.assets)
+      return self.render_frame(screen)
+    self.renderer.configure(None, None)
+    return self.present(screen, self.render_frame(self.frame))
+
+  def present(self, screen, dirty):
+    "Scales the changed parts of the 800x600 frame onto the window."
+    full = self.frame.get_rect()
+    rects = []
+    for rect in dirty:
+      rect = pygame.Rect(rect).clip(full)
+      target = self.viewport.rect(rect)
+      if not rect or not target.w or not target.h:
+        continue
+      if rect == full:
+        screen.fill(COLOR_BLACK)
+        rects.append(screen.get_rect())
+      else:
+        rects.append(target)
+      screen.blit(pygame.transform.smoothscale(self.frame.subsurface(rect), target.size), target)
+    return rects
+
+  def render_frame(self, screen):
+    dirty = None
     if self.state in self.render_func:     
-      screen.fill((255,255,255))
-      self.render_func[self.state](screen)
+      if self.editor or not self.state in ('playing', 'paused', 'no_moves'):
+        screen.fill((255,255,255))
+        self.renderer.invalidate()
+      dirty = self.render_func[self.state](screen)
       
     if self.editor:
       self.draw_tile_cursor(screen)  
 
+    if dirty is None:
+      dirty = [screen.get_rect()]
+    return dirty
+
 
   def handle_menu_input(self, event):
     if event.type == pygame.MOUSEMOTION:
-      x,y = pygame.mouse.get_pos()
+      x,y = event.pos
       for i in range(4):
         if is_in(x,y,(310, 200+42*i, 250, 30)):
           if not i == self.m_selector:
@@ -183,7 +274,7 @@ class Game:
             self.m_selector = i
 
     if event.type == pygame.MOUSEBUTTONDOWN:
-      x,y = pygame.mouse.get_pos()
+      x,y = event.pos
       self.sound_toggle_check(event)
       for i in range(5):
         if is_in(x,y,(310, 200+42*i, 250, 30)):
@@ -235,16 +326,43 @@ class Game:
           self.resources['sfx_back'].play()
         sys.exit()
           
+  def start_level(self, filename, seed=None):
+    "Deals a level and starts playing it. When games are recorded, the deal's \
+     seed goes into the replay log, so the game can be played back."
+    if seed is None:
+      seed = random.randrange(1 << 31)
+    self.state = 'playing'     
+    self.dealt = load_level(filename=filename, rnd=True, seed=seed)
+    self.core = GameState(self.dealt, now=pygame.time.get_ticks())
+    self.tiles = self.core.board
+    self.stop_recording()
+    if self.replay_dir:
+      self.recorder = ReplayWriter.create(self.replay_dir, filename, seed, self.core, self.dealt)
+    self.hits = HitGrid(self.tiles)
+    self.filename = filename
+    self.selected = None
+    self.hint = None
+
   def handle_playing_input(self, event):
     if event.type == pygame.KEYDOWN:
       if event.key == pygame.K_ESCAPE:
         if self.sound_on:
           self.resources['sfx_back'].play()
         if not self.editor:
+          self.stop_recording()
           self.state = 'level_select'
         else:
           sys.exit()
         return
+      if event.unicode == 'h' and not self.editor:
+        self.hint = self.tiles.hint()
+        return
+      if event.unicode == 'u' and not self.editor:
+        self.undo_move()
+        return
+      if event.unicode == 'r' and not self.editor:
+        self.redo_move()
+        return
       
     if event.type == pygame.MOUSEBUTTONDOWN:
       backrect  = (720, 16, 32, 32)
@@ -253,62 +371,111 @@ class Game:
       if is_in(x,y,backrect):
         if self.sound_on:
           self.resources['sfx_back'].play()
+        self.stop_recording()
         self.state = 'level_select'
         return
       if is_in(x,y,pauserect):
         self.state = 'paused'
-        self.paused_at = pygame.time.get_ticks()
+        self.core.pause(pygame.time.get_ticks())
         return
 
       self.sound_toggle_check(event)
+      self.hint = None
 
+      x,y = event.pos
+      tile = self.hits.pick(x,y)
+      if not tile:
+        self.selected = None
+        return
 
-      for tile in sorted(self.tiles, key=byTopRight, reverse=True) :
-          x,y = event.pos
-          if x >= tile.x - tile.z * 3 and x <= tile.x + 40 - tile.z * 3 and \
-             y >= tile.y - tile.z * 3 and y <= tile.y + 60 - tile.z * 3:
-             if self.selected == tile: 
-              self.selected = None
-              return
-             if self.selected: 
-              if self.selected.tileno == tile.tileno:     
-                if not tile.is_blocked(self.tiles) and not self.selected.is_blocked(self.tiles):
-                  self.tiles.remove(self.selected)
-                  self.tiles.remove(tile)
-                  self.pieces_removed += 2
-                  
-                  # If we won!
-                  if len(self.tiles) == 0:
-                    self.state = 'level_complete'
-                    self.score = str((pygame.time.get_ticks()-self.time_started)/1000)
-                    pygame.event.clear()
-                    
-                    self.write_score()
-                    return
-                self.selected = None
-                return
-              else:
-                self.selected = None
-                return
-             else:
-              if not tile.is_blocked(self.tiles):
-                self.selected = tile       
-             return
-             
-             
-      self.selected = None    
+      if self.selected == tile: 
+        self.selected = None
+        return
+      if self.selected: 
+        if self.remove_pair(self.selected, tile):
+          if self.state == 'level_complete':
+            return
+        self.selected = None
+      elif not self.tiles.is_blocked(tile):
+        self.selected = tile       
+   
+  def stop_recording(self):
+    "Closes the replay log of the game being left, if it is recorded."
+    if self.recorder:
+      self.recorder.close()
+      self.recorder = None
+
+  def remove_pair(self, a, b):
+    "Removes a pair if the rules allow it, and records the move. Returns \
+     whether it did."
+    now = pygame.time.get_ticks()
+    if not self.core.remove(a, b):
+      return False
+    self.hits.remove(a)
+    self.hits.remove(b)
+    self.renderer.tiles_removed((a, b))
+    if self.recorder:
+      self.recorder.move(self.core.elapsed(now), a, b)
+    self.check_finished(now)
+    return True
+
+  def check_finished(self, now):
+    "After a pair is removed: finish the level if the board is clear, or \
+     show that there are no moves left. Returns whether the level was won."
+    # If we won!
+    if self.core.is_won():
+      self.state = 'level_complete'
+      self.score = str(self.core.elapsed(now)/1000)
+      pygame.event.clear()
+              
+      if self.recorder:
+        self.recorder.won(self.core.elapsed(now))
+      self.stop_recording()
+      if not self.playback:
+        self.write_score(now)
+      return True
+
+    if self.core.is_stuck():
+      self.state = 'no_moves'
+    return False
+
+  def undo_move(self):
+    "Puts the last removed pair back on the board."
+    pair = self.core.undo()
+    if pair:
+      if self.recorder:
+        self.recorder.undo(self.core.elapsed(pygame.time.get_ticks()))
+      for tile in pair:
+        self.hits.add(tile)
+      self.renderer.tiles_added(pair)
+      self.state = 'playing'
+      self.selected = None
+      self.hint = None
+    return pair
+
+  def redo_move(self):
+    "Removes the last pair put back by undo again."
+    pair = self.core.redo()
+    if pair:
+      now = pygame.time.get_ticks()
+      if self.recorder:
+        self.recorder.redo(self.core.elapsed(now))
+      for tile in pair:
+        self.hits.remove(tile)
+      self.renderer.tiles_removed(pair)
+      self.selected = None
+      self.hint = None
+      self.check_finished(now)
+    return pair
    
   def handle_level_select_input(self, event):
 
-    levels = os.listdir(os.path.abspath('levels/'))
-    max = len(levels)-1 
-    
-    if 'scores' in levels:
-      levels.remove('scores')
+    levels = self.catalog.levels()
+    max = len(levels)
 
     if event.type == pygame.MOUSEMOTION:
+      x,y = event.pos
       for i in range(len(levels)):
-        x,y = pygame.mouse.get_pos()        
         if is_in(x,y,(310, 200 + i * 50, 300, 30)):
           if not i == self.m_selector:
             if self.sound_on:
@@ -322,17 +489,12 @@ class Game:
           self.m_selector = len(levels)
 
     if event.type == pygame.MOUSEBUTTONDOWN:
+      x,y = event.pos
       for i in range(len(levels)):
-        x,y = pygame.mouse.get_pos()        
         if is_in(x,y,(310, 200 + i * 50, 300, 42)):
           if self.sound_on:
             self.resources['sfx_select'].play()
-          self.state = 'playing'     
-          self.time_started = pygame.time.get_ticks()
-          self.pieces_removed = 0
-          self.tiles = load_level(filename=levels[self.m_selector], rnd=True)
-          self.filename = levels[self.m_selector]
-          self.start_piece_count = len(self.tiles)
+          self.start_level(levels[self.m_selector])
 
       if is_in(x,y,(310, 100, 300, 84)):
         if self.sound_on:
@@ -373,18 +535,23 @@ class Game:
         
         if self.sound_on:
           self.resources['sfx_select'].play()
-        self.state = 'playing'     
-        self.time_started = pygame.time.get_ticks()
-        self.pieces_removed = 0
-        self.tiles = load_level(filename=levels[self.m_selector], rnd=True)
-        self.filename = levels[self.m_selector]
-        self.start_piece_count = len(self.tiles)        
+        self.start_level(levels[self.m_selector])
   
   def handle_level_complete_input(self, event):
     if event.type == pygame.MOUSEBUTTONDOWN:
       self.state = 'level_select'
       self.selected = None
   
+  def handle_no_moves_input(self, event):
+    if event.type == pygame.KEYDOWN and event.unicode == 'u':
+      self.undo_move()
+      return
+    if event.type == pygame.MOUSEBUTTONDOWN or \
+       (event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_RETURN)):
+      self.stop_recording()
+      self.state = 'level_select'
+      self.selected = None
+
   def handle_paused_input(self, event):
     if event.type == pygame.MOUSEBUTTONDOWN:
       backrect  = (720, 16, 32, 32)
@@ -394,11 +561,12 @@ class Game:
       self.sound_toggle_check(event)
 
       if is_in(x,y,backrect):
+        self.stop_recording()
         self.state = 'level_select'
         
       if is_in(x,y,pauserect):
         self.state = 'playing'
-        self.time_started += (pygame.time.get_ticks() - self.paused_at)
+        self.core.resume(pygame.time.get_ticks())
       
     
     
@@ -410,7 +578,7 @@ class Game:
       if event.key == pygame.K_LEFT or \
          event.key == pygame.K_RIGHT:
       
-        levels = os.listdir(os.path.abspath('levels/scores'))
+        levels = self.catalog.score_files()
         max = len(levels)
         if self.viewing_highscores_for:
           selected = levels.index(self.viewing_highscores_for)
@@ -436,22 +604,15 @@ class Game:
     render_text(screen, self.font, "Left/Right to Cycle", (450,20,300,300), color=(255,74,203))
     
     if self.viewing_highscores_for:
-      scorepath = os.path.abspath('levels/scores/' + self.viewing_highscores_for)
-      fh = open(scorepath, 'r')
-      if fh:
-        text = fh.read()
-        scores = re.findall('[(](\w+),(\d+)[)]', text)
+      scores = self.scores.top(self.viewing_highscores_for)
         
-        render_text(screen, self.font, self.viewing_highscores_for,( 300,125,300,300))
-        i = 1
-        for score in scores:
-          render_text(screen, self.font, score[0]+' - '+score[1] + ' seconds...',( 325,125+i*50,350,300))
-          i += 1
+      render_text(screen, self.font, self.viewing_highscores_for,( 300,125,300,300))
+      i = 1
+      for score in scores:
+        render_text(screen, self.font, score[0]+' - '+str(score[1]) + ' seconds...',( 325,125+i*50,350,300))
+        i += 1
     else:
-      levels = os.listdir(os.path.abspath('levels/scores/'))
-      
-      if 'scores' in levels:
-        levels.remove('scores')
+      levels = self.catalog.score_files()
       
       if len(levels) > 0:
         self.viewing_highscores_for = levels[0]
@@ -459,7 +620,7 @@ class Game:
         render_text(screen, self.font, "You have no high scores yet.", (200,255,30,300))
       
   def render_level_complete(self, screen):
-    rose = pygame.image.load('res/rose.jpg')
+    rose = self.resources['rose']
     roserect = (220,120,318,350)
     screen.blit(rose,roserect)
     render_black_bars(screen)
@@ -468,38 +629,59 @@ class Game:
     render_text(screen, self.font,  str(self.score) + " seconds, sweet!", (20,20,300,300), color=(255,74,203))
       
   def render_playing(self,screen):
-    render_black_bars(screen)
-    
-    if self.editor:
-      render_text(screen, self.font, "Level Editor", (20,20,300,300), color=(255,74,203))
-      render_text(screen, self.font, "S = save, U = undo", (500,20,300,300), color=(255,74,203))
-      render_text(screen, self.font, "Editing: " + self.filename, (20,520,200,100), color=(255,74,203))
-      render_text(screen, self.font, "Pieces Placed: " + str(len(self.tiles)), (20,560,200,100), color=(255,255,255,))
-    else:
-      render_text(screen, self.font, "Vanessa's Mahjong", (20,20,300,300), color=(255,74,203))
-      render_text(screen, self.font, "Pieces Removed: ", (20,540,200,100), color=(255,74,203))
-      render_text(screen, self.font, str(self.pieces_removed) + ' of ' + str(self.start_piece_count), (300,540,200,50), color=(255,255,255))
-      screen.blit(self.resources['back'], (720, 16, 32, 32))
-      if self.state == 'playing':
-        screen.blit(self.resources['pause'], (760, 16, 32, 32))
-        render_text(screen, self.font, "Time Elapsed: ", (470, 540, 100,100), color=(255,74,203))
-        render_text(screen, self.font, str(int((pygame.time.get_ticks()  - self.time_started) / 1000)), \
-                    (705, 540, 100,100), color=(255,255,255))
-      elif self.state == 'paused':
-        screen.blit(self.resources['play'], (760, 16, 32, 32))
-        render_text(screen, self.font, "Paused", (470, 540, 100,100), color=(255,255,255))
+    if not self.editor:
+      return self.renderer.render(screen, self)
 
+    render_black_bars(screen)
+    render_text(screen, self.font, "Level Editor", (20,20,300,300), color=(255,74,203))
+    render_text(screen, self.font, "S = save, U = undo", (500,20,300,300), color=(255,74,203))
+    render_text(screen, self.font, "Editing: " + self.filename, (20,520,200,100), color=(255,74,203))
+    render_text(screen, self.font, "Pieces Placed: " + str(len(self.tiles)), (20,560,200,100), color=(255,255,255,))
     self.blit_sound_icon(screen)
 
     for tile in self.tiles:
-      if self.state == 'paused':
-        tile.draw(screen, paused=True)
-      else:
-        tile.draw(screen)
- 
-      if self.selected: 
-        pygame.draw.rect(screen, (255,0,0), (self.selected.x - self.selected.z * 3, \
-                                             self.selected.y - self.selected.z * 3, 40-2, 60-2),2)
+      tile.draw(screen)
+
+  def playing_hud(self):
+    "Everything drawn over the board while playing, as slot -> (key, pos). \
+     The renderer only redraws a slot when its key or position changes."
+    hud = { 'title'         : (('text', "Vanessa's Mahjong", COLOR_PINK), (20,20)),  \
+            'removed_label' : (('text', "Pieces Removed: ", COLOR_PINK),  (20,540)), \
+            'removed'       : (('text', str(self.core.pieces_removed) + ' of ' + str(self.core.start_piece_count), COLOR_WHITE), (300,540)), \
+            'back'          : (('icon', 'back'), (720,16)) \
+    }
+    if self.state == 'playing':
+      hud['pause']  = (('icon', 'pause'), (760,16))
+      hud['status'] = (('text', "Time Elapsed: ", COLOR_PINK), (470,540))
+      hud['timer']  = (('number', int(self.core.elapsed(pygame.time.get_ticks()) / 1000), COLOR_WHITE), (705,540))
+    elif self.state == 'paused':
+      hud['pause']  = (('icon', 'play'), (760,16))
+      hud['status'] = (('text', "Paused", COLOR_WHITE), (470,540))
+    elif self.state == 'no_moves':
+      hud['status'] = (('text', "No moves left!", COLOR_WHITE), (470,540))
+
+    if self.sound_on:
+      hud['sound'] = (('icon', 'sound_on'), (680,16))
+    else:
+      hud['sound'] = (('icon', 'sound_off'), (680,16))
+    return hud
+
+  def playing_marks(self):
+    "Outlines drawn over tiles, as slot -> (rect, color)."
+    marks = {}
+    if self.selected:
+      marks['selected'] = (self.selected.screen_rect(), COLOR_SELECTED)
+    if self.hint:
+      marks['hint_a'] = (self.hint[0].screen_rect(), COLOR_HINT)
+      marks['hint_b'] = (self.hint[1].screen_rect(), COLOR_HINT)
+    return marks
+
+  def hud_surface(self, key):
+    if key[0] == 'icon':
+      return self.resources[key[1]]
+    if key[0] == 'number':
+      return get_number_surf(self.font, key[1], color=key[2])
+    return get_string_surf(self.font, key[1], color=key[2])
 
   def blit_sound_icon(self, screen):
     if self.sound_on:
@@ -528,21 +710,22 @@ class Game:
     render_text(screen, self.font, "Vanessa's Mahjong", (20,20,300,300), color=(255,74,203))
     render_text(screen, self.font, "Select a level...", (20,540,200,100), color=(255,74,203))
     i = 0
-    levels = os.listdir(os.path.abspath('levels/'))
+    levels = self.catalog.levels()
     for level in levels:
-      if level == 'scores':
-        continue
       render_text(screen, self.font, level, (310, 200 + i * 50, 300, 300))
+      rating = self.catalog.rating(level)
+      if rating and 'difficulty' in rating:
+        render_text(screen, self.font, rating['difficulty'], (560, 200 + i * 50, 200, 300), color=(160,160,160))
       i += 1
     render_text(screen, self.font, "BACK", (310, 100, 300, 300))
-    if self.m_selector == len(levels)-1:
+    if self.m_selector == len(levels):
       render_text(screen, self.font, "-", (280, 100, 300, 300 ))
     else:
       render_text(screen, self.font, "-", (280, 200 + self.m_selector * 50, 300, 300 ))
     self.blit_sound_icon(screen)
 
   def render_paused(self,screen):
-    self.render_playing(screen)
+    return self.render_playing(screen)
     
     pass
     
\ No newline at end of file
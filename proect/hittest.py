@@ -0,0 +1,47 @@
+from bisect import insort
+
+from tile import *
+
+class HitGrid:
+  "A uniform grid over the play area whose cells list the tiles overlapping \
+   them, topmost first, so a click only looks at the handful of tiles under \
+   the cursor. Update it with add/remove when the board changes."
+  def __init__(self, tiles=(), cell_w=20, cell_h=30):
+    self.cell_w = cell_w
+    self.cell_h = cell_h
+    self.cells  = {}     # (col, row) -> [(priority, tile)], topmost first
+
+    for tile in tiles:
+      self.add(tile)
+
+  def _priority(self, tile):
+    # Same order as sorting by byTopRight in reverse.
+    return (-tile.z, -tile.x, -tile.y)
+
+  def _cells(self, tile):
+    rect = tile.screen_rect()
+    for col in range(rect.left // self.cell_w, rect.right // self.cell_w + 1):
+      for row in range(rect.top // self.cell_h, rect.bottom // self.cell_h + 1):
+        yield (col, row)
+
+  def add(self, tile):
+    entry = (self._priority(tile), id(tile), tile)
+    for cell in self._cells(tile):
+      insort(self.cells.setdefault(cell, []), entry)
+
+  def remove(self, tile):
+    for cell in self._cells(tile):
+      entries = self.cells[cell]
+      for i, entry in enumerate(entries):
+        if entry[2] is tile:
+          del entries[i]
+          break
+
+  def pick(self, x, y):
+    "The topmost tile at (x, y), edges included, or None."
+    for priority, ident, tile in self.cells.get((x // self.cell_w, y // self.cell_h), ()):
+      left = tile.x - tile.z * 3
+      top  = tile.y - tile.z * 3
+      if x >= left and x <= left + 40 and y >= top and y <= top + 60:
+        return tile
+    return None
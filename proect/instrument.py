@@ -0,0 +1,144 @@
+import json
+import time
+from collections import deque
+
+import pygame
+
+# Upper bounds (ms) of the histogram buckets; the last one catches the rest.
+BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133)
+
+class StageStats:
+  "Time spent in one stage: a rolling window of recent frames for the \
+   overlay, and a histogram of every frame for the report."
+  def __init__(self, window):
+    self.recent    = deque(maxlen=window)
+    self.histogram = [0] * (len(BUCKETS) + 1)
+    self.frames    = 0
+    self.total     = 0.0
+    self.worst     = 0.0
+
+  def add(self, ms):
+    self.recent.append(ms)
+    self.frames += 1
+    self.total  += ms
+    self.worst   = max(self.worst, ms)
+    for i, bound in enumerate(BUCKETS):
+      if ms <= bound:
+        self.histogram[i] += 1
+        break
+    else:
+      self.histogram[-1] += 1
+
+  def average(self):
+    return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+  def report(self):
+    labels = ['<=%gms' % bound for bound in BUCKETS] + ['>%gms' % BUCKETS[-1]]
+    return { 'frames'    : self.frames,                                  \
+             'mean_ms'   : self.total / self.frames if self.frames else 0.0, \
+             'max_ms'    : self.worst,                                   \
+             'histogram' : dict(zip(labels, self.histogram))             \
+    }
+
+class Profiler:
+  "Opt-in frame profiler. wrap() swaps a function for one that adds its run \
+   time to a stage, so nothing is measured, and nothing costs anything, \
+   unless the profiler was set up. Stage times are summed over a frame and \
+   recorded by end_frame()."
+  def __init__(self, window=120):
+    self.window  = window
+    self.stages  = {}          # stage -> StageStats, in the order first seen
+    self.current = {}          # stage -> ms so far this frame
+    self.frame_started = None
+    self.ends    = deque(maxlen=window)   # perf_counter at the end of recent frames
+    self.started = time.perf_counter()
+    self.font    = None
+    self.under   = None        # (rect, saved screen pixels) below the overlay
+    self.shown   = None        # where the overlay is on the display
+
+  def timed(self, fn, stage):
+    "Returns fn wrapped to add its run time to 'stage'."
+    current = self.current
+    clock   = time.perf_counter
+    def wrapper(*args, **kwargs):
+      started = clock()
+      try:
+        return fn(*args, **kwargs)
+      finally:
+        current[stage] = current.get(stage, 0.0) + (clock() - started) * 1000
+    wrapper.__name__ = getattr(fn, '__name__', stage)
+    return wrapper
+
+  def wrap(self, owner, name, stage=None):
+    "Replaces owner.name (an instance's or a class's) with a timed version."
+    setattr(owner, name, self.timed(getattr(owner, name), stage or name))
+
+  def instrument(self, game):
+    "Times the hot paths of a Game: input handling, each render_* method and \
+     every tile blit."
+    from tile import Tile
+    self.wrap(game, 'handle_input', 'input')
+    for state, fn in list(game.render_func.items()):
+      game.render_func[state] = self.timed(fn, fn.__name__)
+    self.wrap(Tile, 'draw', 'tile_blits')
+
+  def begin_frame(self):
+    self.frame_started = time.perf_counter()
+
+  def end_frame(self):
+    "Files this frame's stage times, and the frame's own time."
+    now = time.perf_counter()
+    if self.frame_started is not None:
+      self.current['frame'] = (now - self.frame_started) * 1000
+    for stage, ms in self.current.items():
+      if stage not in self.stages:
+        self.stages[stage] = StageStats(self.window)
+      self.stages[stage].add(ms)
+    self.current.clear()
+    self.ends.append(now)
+
+  def fps(self):
+    if len(self.ends) < 2:
+      return 0.0
+    return (len(self.ends) - 1) / (self.ends[-1] - self.ends[0])
+
+  def lines(self):
+    lines = ['%5.1f fps' % self.fps()]
+    for stage, stats in self.stages.items():
+      lines.append('%-16s %6.2f ms' % (stage, stats.average()))
+    return lines
+
+  def draw_overlay(self, screen, pos=(4, 84)):
+    "Draws the rolling averages over the screen and returns the rect to \
+     update, which also covers where the last overlay was. The pixels \
+     underneath are saved, and put back by restore() once the display was \
+     updated, so retained-mode rendering never sees the overlay."
+    if self.font is None:
+      self.font = pygame.font.Font(None, 18)
+    surfs = [self.font.render(line, True, (255,255,255)) for line in self.lines()]
+    width  = max(surf.get_width() for surf in surfs) + 8
+    height = sum(surf.get_height() for surf in surfs) + 8
+    rect = pygame.Rect(pos, (width, height)).clip(screen.get_rect())
+    self.under = (rect, screen.subsurface(rect).copy())
+    screen.fill((0,0,0), rect)
+    y = rect.top + 4
+    for surf in surfs:
+      screen.blit(surf, (rect.left + 4, y))
+      y += surf.get_height()
+    shown, self.shown = self.shown, rect
+    return rect.union(shown) if shown else rect
+
+  def restore(self, screen):
+    if self.under:
+      rect, saved = self.under
+      screen.blit(saved, rect)
+      self.under = None
+
+  def report(self):
+    return { 'seconds' : time.perf_counter() - self.started,                        \
+             'stages'  : dict((stage, stats.report()) for stage, stats in self.stages.items()) \
+    }
+
+  def dump(self, path):
+    with open(path, 'w') as fh:
+      json.dump(self.report(), fh, indent=2, sort_keys=True)
@@ -0,0 +1,44 @@
+# Kinds of move a delta records.
+REMOVE = 'remove'     # (REMOVE, a, b): a pair taken off the board
+PLACE  = 'place'      # (PLACE, tile): a tile placed in the editor
+
+class Journal:
+  "Undo/redo history as a list of small deltas and a cursor into it. Undo \
+   and redo only move the cursor; recording a move after undoing drops the \
+   undone ones. The board itself is never copied, so the history can grow \
+   without limit."
+  def __init__(self):
+    self.entries = []
+    self.cursor  = 0           # entries before the cursor are in effect
+
+  def __len__(self):
+    return self.cursor
+
+  def record(self, delta):
+    del self.entries[self.cursor:]
+    self.entries.append(delta)
+    self.cursor += 1
+
+  def can_undo(self):
+    return self.cursor > 0
+
+  def can_redo(self):
+    return self.cursor < len(self.entries)
+
+  def undo(self):
+    "Steps back over the last move in effect and returns its delta, or None."
+    if not self.can_undo():
+      return None
+    self.cursor -= 1
+    return self.entries[self.cursor]
+
+  def redo(self):
+    "Steps forward over the last undone move and returns its delta, or None."
+    if not self.can_redo():
+      return None
+    self.cursor += 1
+    return self.entries[self.cursor - 1]
+
+  def done(self):
+    "The deltas in effect, oldest first."
+    return self.entries[:self.cursor]
@@ -0,0 +1,110 @@
+import sys
+import os
+import os.path
+import re
+import mmap
+import struct
+from array import array
+
+# Binary level layout: a header (magic, format version, reserved, tile count)
+# followed by four little-endian int16 columns of 'count' entries each, in the
+# order tile number, x, y, z.
+MAGIC   = b'MJLV'
+VERSION = 1
+HEADER  = struct.Struct('<4sHHI')
+
+# path -> ((mtime, size), records)
+_layouts = {}
+
+def parse_text(text):
+  "The original '(no,x,y,z)(no,x,y,z)...' format."
+  return tuple((int(no),int(x),int(y),int(z)) for no,x,y,z in \
+               re.findall(r'[(](\d+),(\d+),(\d+),(\d+)[)]', text))
+
+def parse_binary(buf):
+  if len(buf) < HEADER.size:
+    raise ValueError('Truncated level file: %d bytes, the header needs %d' % (len(buf), HEADER.size))
+  magic, version, reserved, count = HEADER.unpack_from(buf, 0)
+  if magic != MAGIC:
+    raise ValueError('Not a binary level file (magic %r)' % magic)
+  if version != VERSION:
+    raise ValueError('Unsupported level format version %d' % version)
+  size = HEADER.size + count * 4 * 2
+  if len(buf) != size:
+    raise ValueError('Level file holds %d bytes, %d tiles need %d' % (len(buf), count, size))
+
+  columns = array('h')
+  columns.frombytes(buf[HEADER.size:HEADER.size + count * 4 * columns.itemsize])
+  if sys.byteorder != 'little':
+    columns.byteswap()
+  nos, xs, ys, zs = [columns[i*count:(i+1)*count] for i in range(4)]
+  return tuple(zip(nos, xs, ys, zs))
+
+def read_level(path):
+  "Returns the layout in 'path' as a tuple of (no, x, y, z) records, in either \
+   format. Parsed layouts are cached until the file's mtime or size changes."
+  st  = os.stat(path)
+  key = (st.st_mtime_ns, st.st_size)
+  cached = _layouts.get(path)
+  if cached and cached[0] == key:
+    return cached[1]
+
+  records = ()
+  if st.st_size:
+    with open(path, 'rb') as fh:
+      buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+      try:
+        if buf[:len(MAGIC)] == MAGIC:
+          records = parse_binary(buf)
+        else:
+          records = parse_text(buf[:].decode('ascii'))
+      finally:
+        buf.close()
+
+  _layouts[path] = (key, records)
+  return records
+
+def pack_level(records):
+  columns = array('h')
+  for i in range(4):
+    columns.extend(record[i] for record in records)
+  if sys.byteorder != 'little':
+    columns.byteswap()
+  return HEADER.pack(MAGIC, VERSION, 0, len(records)) + columns.tobytes()
+
+def _replace(path, data):
+  "Writes the whole file next to 'path' and moves it over in one step."
+  tmppath = path + '.tmp'
+  with open(tmppath, 'wb') as fh:
+    fh.write(data)
+  os.replace(tmppath, path)
+
+def write_level(path, tiles):
+  "Saves tiles in the binary format."
+  _replace(path, pack_level([(tile.tileno, tile.x, tile.y, tile.z) for tile in tiles]))
+
+def convert(path):
+  "Rewrites a level file in the binary format. Returns the tile count."
+  records = read_level(path)
+  _replace(path, pack_level(records))
+  return len(records)
+
+def main():
+  "Usage: levelfile.py convert [level ...] \
+   Converts the given level files (every file under levels/ by default) to \
+   the binary format."
+  args = sys.argv[1:]
+  if not args or args[0] != 'convert':
+    print (main.__doc__)
+    return
+
+  paths = args[1:]
+  if not paths:
+    from catalog import LevelCatalog
+    catalog = LevelCatalog()
+    paths = [catalog.info(level).path for level in catalog.levels()]
+  for path in paths:
+    print ('%s: %d tiles' % (path, convert(path)))
+
+if __name__ == "__main__":
+  main()
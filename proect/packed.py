@@ -0,0 +1,188 @@
+from array import array
+
+from tile import *
+from board import *
+
+class Layout:
+  "The positions of a level in parallel int16 columns, with the blocking \
+   relations between them worked out once. A layout never changes, so every \
+   board dealt from it can share it."
+  def __init__(self, positions):
+    self.xs = array('h')
+    self.ys = array('h')
+    self.zs = array('h')
+    self.index = {}
+    for x, y, z in positions:
+      self.index[(x, y, z)] = len(self.xs)
+      self.xs.append(x)
+      self.ys.append(y)
+      self.zs.append(z)
+
+    columns = {}
+    for i in range(len(self.xs)):
+      columns.setdefault((self.xs[i], self.ys[i]), []).append(i)
+
+    above, left, right = [], [], []
+    affects = [[] for i in range(len(self.xs))]
+    for i in range(len(self.xs)):
+      x, y, z = self.xs[i], self.ys[i], self.zs[i]
+      a = [j for dx, dy in COVER_OFFSETS for j in columns.get((x + dx, y + dy), ()) if self.zs[j] > z]
+      l = [self.index[(x - 40, y + dy, z)] for dy in SIDE_OFFSETS if (x - 40, y + dy, z) in self.index]
+      r = [self.index[(x + 40, y + dy, z)] for dy in SIDE_OFFSETS if (x + 40, y + dy, z) in self.index]
+      above.append(tuple(a))
+      left.append(tuple(l))
+      right.append(tuple(r))
+      for j in a + l + r:
+        affects[j].append(i)
+
+    self.above   = tuple(above)
+    self.left    = tuple(left)
+    self.right   = tuple(right)
+    self.affects = tuple(tuple(a) for a in affects)   # tiles whose state depends on i
+
+  def __len__(self):
+    return len(self.xs)
+
+  @classmethod
+  def from_tiles(cls, tiles):
+    return cls((tile.x, tile.y, tile.z) for tile in tiles)
+
+class TileView:
+  "A tile of a PackedBoard. It only holds the board and an index, reads its \
+   fields from the board's columns, and draws like a Tile."
+  __slots__ = ('board', 'index')
+
+  def __init__(self, board, index):
+    self.board = board
+    self.index = index
+
+  tileno = property(lambda self: self.board.tilenos[self.index])
+  x      = property(lambda self: self.board.layout.xs[self.index])
+  y      = property(lambda self: self.board.layout.ys[self.index])
+  z      = property(lambda self: self.board.layout.zs[self.index])
+
+  img         = Tile.img
+  screen_rect = Tile.screen_rect
+  draw        = Tile.draw
+
+  def __eq__(self, other):
+    return isinstance(other, TileView) and other.board is self.board and other.index == self.index
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __hash__(self):
+    return hash((id(self.board), self.index))
+
+class PackedBoard:
+  "A deal on a shared Layout: the tile numbers as an int16 column and the \
+   removed and free tiles as bitmasks. Offers the same queries as Board at a \
+   small fraction of the memory, for simulations that keep many boards."
+  __slots__ = ('layout', 'tilenos', 'kinds', 'removed', 'free', 'remaining')
+
+  def __init__(self, layout, tilenos):
+    self.layout    = layout
+    self.tilenos   = array('h', tilenos)
+    self.kinds     = {}      # tileno -> bitmask of tiles with that number
+    self.removed   = 0
+    self.free      = 0
+    self.remaining = len(layout)
+    for i, no in enumerate(self.tilenos):
+      self.kinds[no] = self.kinds.get(no, 0) | (1 << i)
+    for i in range(len(layout)):
+      if self._is_free(i):
+        self.free |= 1 << i
+
+  @classmethod
+  def from_tiles(cls, tiles, layout=None):
+    tiles = list(tiles)
+    return cls(layout or Layout.from_tiles(tiles), [tile.tileno for tile in tiles])
+
+  def _present(self, i):
+    return not (self.removed >> i) & 1
+
+  def _is_free(self, i):
+    layout = self.layout
+    for j in layout.above[i]:
+      if self._present(j):
+        return False
+    for j in layout.left[i]:
+      if self._present(j):
+        break
+    else:
+      return True
+    for j in layout.right[i]:
+      if self._present(j):
+        return False
+    return True
+
+  def _refresh(self, i):
+    if self._present(i) and self._is_free(i):
+      self.free |= 1 << i
+    else:
+      self.free &= ~(1 << i)
+
+  def __len__(self):
+    return self.remaining
+
+  def __iter__(self):
+    return iter([TileView(self, i) for i in range(len(self.layout)) if self._present(i)])
+
+  def __contains__(self, tile):
+    return isinstance(tile, TileView) and tile.board is self and self._present(tile.index)
+
+  def tile_at(self, x, y, z):
+    i = self.layout.index.get((x, y, z))
+    if i is None or not self._present(i):
+      return None
+    return TileView(self, i)
+
+  def is_blocked(self, tile):
+    return not (self.free >> tile.index) & 1
+
+  def free_tiles(self):
+    return [TileView(self, i) for i in bits(self.free)]
+
+  def count_free(self):
+    return bin(self.free).count('1')
+
+  def free_groups(self):
+    "Lists of free tiles sharing a number, for every number with a pair free."
+    groups = []
+    for no in sorted(self.kinds):
+      ready = self.free & self.kinds[no]
+      if ready & (ready - 1):
+        groups.append([TileView(self, i) for i in bits(ready)])
+    return groups
+
+  def has_moves(self):
+    for mask in self.kinds.values():
+      ready = self.free & mask
+      if ready & (ready - 1):
+        return True
+    return False
+
+  def hint(self):
+    for group in self.free_groups():
+      return group[0], group[1]
+    return None
+
+  def add(self, tile):
+    i = tile.index
+    self.removed &= ~(1 << i)
+    self.remaining += 1
+    self._refresh(i)
+    for j in self.layout.affects[i]:
+      self._refresh(j)
+
+  def remove(self, tile):
+    i = tile.index
+    self.removed |= 1 << i
+    self.remaining -= 1
+    self.free &= ~(1 << i)
+    for j in self.layout.affects[i]:
+      self._refresh(j)
+
+  def remove_pair(self, a, b):
+    self.remove(a)
+    self.remove(b)
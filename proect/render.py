@@ -0,0 +1,267 @@
+import pygame
+
+from tile import *
+
+COLOR_SELECTED = (255,0,0)
+COLOR_HINT     = (0,160,255)
+
+class LevelTiles:
+  "The tiles on one z level in drawing order, also filed by the tile-sized \
+   cell their corner is in, so the tiles near a spot are found without \
+   scanning the level and adding or removing one costs the same on any board."
+  def __init__(self):
+    self.order = {}            # tile -> sequence number, in drawing order
+    self.cells = {}            # (column, row) -> {tile: None}
+    self.count = 0
+
+  def __len__(self):
+    return len(self.order)
+
+  def __iter__(self):
+    return iter(self.order)
+
+  def cell(self, tile):
+    rect = tile.screen_rect()
+    return (rect.x // TILE_W, rect.y // TILE_H)
+
+  def add(self, tile):
+    if tile not in self.order:
+      self.count += 1
+      self.order[tile] = self.count
+      self.cells.setdefault(self.cell(tile), {})[tile] = None
+
+  def remove(self, tile):
+    if tile in self.order:
+      del self.order[tile]
+      cell = self.cell(tile)
+      del self.cells[cell][tile]
+      if not self.cells[cell]:
+        del self.cells[cell]
+
+  def near(self, tile):
+    "The tiles whose faces can touch 'tile''s, in drawing order. One cell of \
+     slack is kept all round, for faces that scaling rounds a pixel wider."
+    cx, cy = self.cell(tile)
+    found = []
+    for column in range(cx - 2, cx + 3):
+      for row in range(cy - 2, cy + 3):
+        found.extend(self.cells.get((column, row), ()))
+    found.sort(key=self.order.get)
+    return found
+
+class LevelLayer:
+  "The tiles of one z level drawn on a transparent surface that only covers \
+   the level's bounding box. Removing or restoring a tile redraws just the \
+   tiles of this level around it."
+  def __init__(self, renderer, tiles, rect, paused):
+    self.renderer = renderer
+    self.tiles  = tiles        # the renderer's LevelTiles, removed tiles drop out
+    self.paused = paused
+    self.rect   = rect         # covers every tile the level started with
+    self.surf = pygame.Surface(self.rect.size, pygame.SRCALPHA).convert_alpha()
+    self.draw(self.rect, self.tiles)
+
+  def draw(self, rect, tiles):
+    "Redraws the part of the level inside 'rect', where 'tiles' are the \
+     tiles that can reach into it."
+    area = rect.clip(self.rect)
+    if not area:
+      return
+    local = area.move(-self.rect.x, -self.rect.y)
+    self.surf.fill((0,0,0,0), local)
+    self.surf.set_clip(local)
+    for tile in tiles:
+      if area.colliderect(self.renderer.tile_rect(tile)):
+        self.renderer.draw_tile(self.surf, tile, self.paused, self.rect.topleft)
+    self.surf.set_clip(None)
+
+class DirtyRenderer:
+  "Retained-mode renderer for the playing and paused states. Every z level of \
+   the board is kept on its own surface and composited over the background \
+   into an off-screen layer; removing or restoring tiles redraws only their \
+   levels around them and re-composites only those rects. Each frame only the \
+   HUD items and selection that changed are drawn over the layer, and the \
+   rects that need updating on the display are returned. \
+   Given a Viewport and the ScaledAssets for it, the renderer draws straight \
+   onto a window of that size with the pre-scaled surfaces; all the positions \
+   it is handed stay in logical 800x600 coordinates."
+  def __init__(self, paint_background):
+    self.paint_background = paint_background
+    self.viewport = None
+    self.assets   = None
+    self.invalidate()
+
+  def configure(self, viewport, assets):
+    "Switches between drawing at 800x600 (both None) and drawing scaled."
+    if viewport is not self.viewport or assets is not self.assets:
+      self.viewport = viewport
+      self.assets   = assets
+      self.invalidate()
+
+  def line_width(self):
+    if self.viewport is None:
+      return 2
+    return max(2, int(round(2 * self.viewport.scale)))
+
+  def window_rect(self, rect):
+    if self.viewport is None:
+      return pygame.Rect(rect)
+    return self.viewport.rect(rect)
+
+  def tile_rect(self, tile):
+    "Where a tile is drawn on the window. Scaled, every face has the same \
+     size, so the rect is that size at the tile's corner rather than the \
+     scaled screen rect, which rounding can leave a pixel short; drawing, \
+     dirty rects and repairs all use this one rect."
+    if self.viewport is None:
+      return tile.screen_rect()
+    return pygame.Rect(self.viewport.point(tile.screen_rect().topleft), self.assets.face_size)
+
+  def draw_tile(self, surf, tile, paused, origin):
+    if self.assets is None:
+      tile.draw(surf, paused=paused, origin=origin)
+      return
+    rect = self.tile_rect(tile)
+    face = self.assets.face('template' if paused else tile.tileno)
+    surf.blit(face, (rect.x - origin[0], rect.y - origin[1]))
+
+  def invalidate(self):
+    "Forget everything on screen, the next frame redraws it all."
+    self.board   = None
+    self.tiles   = {}          # z -> LevelTiles on that level
+    self.bounds  = {}          # z -> screen rect covering the whole level
+    self.levels  = {}          # paused flag -> {z: LevelLayer}
+    self.layers  = {}          # paused flag -> composited board surface
+    self.shown   = None        # which layer is currently on screen
+    self.hud     = {}          # slot -> (key, rect) currently on screen
+    self.marks   = {}          # slot -> (rect, color) outlined on screen
+    self.pending = []          # removed or restored tiles, not yet repaired
+
+  def attach(self, board):
+    self.invalidate()
+    self.board = board
+    for tile in board:
+      if tile.z not in self.tiles:
+        self.tiles[tile.z] = LevelTiles()
+      self.tiles[tile.z].add(tile)
+      if tile.z in self.bounds:
+        self.bounds[tile.z].union_ip(self.tile_rect(tile))
+      else:
+        self.bounds[tile.z] = self.tile_rect(tile)
+
+  def tiles_removed(self, tiles):
+    for tile in tiles:
+      if tile.z in self.tiles:
+        self.tiles[tile.z].remove(tile)
+      self.pending.append(tile)
+
+  def tiles_added(self, tiles):
+    "Tiles put back on the board (by undo), which must be ones it started with."
+    for tile in tiles:
+      if tile.z not in self.tiles:
+        self.tiles[tile.z] = LevelTiles()
+      self.tiles[tile.z].add(tile)
+      self.pending.append(tile)
+
+  def compose(self, surf, levels, rect):
+    "Paints the background and every level, bottom up, inside rect."
+    surf.set_clip(rect)
+    self.paint_background(surf, self.viewport)
+    for z in sorted(levels):
+      level = levels[z]
+      if rect.colliderect(level.rect):
+        surf.blit(level.surf, level.rect)
+    surf.set_clip(None)
+
+  def layer(self, screen, paused):
+    if paused not in self.layers:
+      levels = {}
+      for z, tiles in self.tiles.items():
+        if tiles:
+          levels[z] = LevelLayer(self, tiles, self.bounds[z], paused)
+      surf = pygame.Surface(screen.get_size()).convert()
+      self.compose(surf, levels, surf.get_rect())
+      self.levels[paused] = levels
+      self.layers[paused] = surf
+    return self.layers[paused]
+
+  def repair(self, tile):
+    "Redraw one level around a removed or restored tile and re-composite that \
+     region. Returns the region."
+    rect, z = self.tile_rect(tile), tile.z
+    near = None
+    for paused, surf in self.layers.items():
+      levels = self.levels[paused]
+      if z in levels:
+        if near is None:
+          near = self.tiles[z].near(tile)
+        levels[z].draw(rect, near)
+      elif self.tiles.get(z):
+        levels[z] = LevelLayer(self, self.tiles[z], self.bounds[z], paused)
+      self.compose(surf, levels, rect)
+    return rect
+
+  def render(self, screen, game):
+    paused = game.state == 'paused'
+    dirty = []
+
+    if game.tiles is not self.board:
+      self.attach(game.tiles)
+
+    # Bring every cached layer up to date first, including the one that is
+    # not on screen, so a removal just before pausing is not lost.
+    pending, self.pending = self.pending, []
+    pending = [self.repair(tile) for tile in pending]
+
+    layer = self.layer(screen, paused)
+    if self.shown != paused:
+      screen.blit(layer, (0,0))
+      self.shown = paused
+      self.hud = {}
+      self.marks = {}
+      pending = []
+      dirty.append(screen.get_rect())
+
+    for rect in pending:
+      screen.blit(layer, rect, rect)
+      dirty.append(rect)
+      for slot, (mark, color) in list(self.marks.items()):
+        if mark.colliderect(rect):
+          del self.marks[slot]
+
+    marks = {}
+    for slot, (rect, color) in game.playing_marks().items():
+      marks[slot] = (self.window_rect(rect.inflate(-2, -2).move(-1, -1)), color)
+    if marks != self.marks:
+      # Marks can overlap, so when any changes they are all redrawn.
+      for rect, color in self.marks.values():
+        screen.blit(layer, rect, rect)
+        dirty.append(rect)
+      for rect, color in marks.values():
+        pygame.draw.rect(screen, color, rect, self.line_width())
+        dirty.append(rect)
+      self.marks = marks
+
+    items = game.playing_hud()
+    for slot in list(self.hud):
+      if slot not in items:
+        key, rect = self.hud.pop(slot)
+        screen.blit(layer, rect, rect)
+        dirty.append(rect)
+    for slot, (key, pos) in items.items():
+      old = self.hud.get(slot)
+      if old and old[0] == (key, pos):
+        continue
+      if old:
+        screen.blit(layer, old[1], old[1])
+        dirty.append(old[1])
+      surf = game.hud_surface(key)
+      at = pos
+      if self.viewport is not None:
+        surf = self.assets.hud(key, surf)
+        at = self.viewport.point(pos)
+      rect = screen.blit(surf, at)
+      self.hud[slot] = ((key, pos), rect)
+      dirty.append(rect)
+
+    return dirty
@@ -0,0 +1,287 @@
+import os
+import os.path
+import sys
+import time
+
+from core import *
+
+FORMAT = 'mahjong-replay 2'
+# A snapshot of the board is written after this many events.
+SNAPSHOT_EVERY = 32
+
+# A replay log is a text file with one record per line, appended as the game
+# is played:
+#
+#   mahjong-replay 2
+#   level <name> <seed> <tiles>     the deal: load_level(name, rnd=True, seed=seed)
+#   m <ms> <i> <j>                  pair i, j removed (indexes into the deal)
+#   u <ms>                          last pair put back
+#   r <ms>                          last pair put back removed again
+#   s <events> <removed> <cursor> | <i,j ...>
+#                                   the board after that many events: a hex
+#                                   bitmask of the removed tiles, how many
+#                                   moves are in effect, and the pairs undone
+#                                   (next to redo first)
+#   w <ms>                          board cleared
+#
+# Times are milliseconds of play (pauses not counted), as GameState.elapsed.
+
+def format_pairs(pairs):
+  return ' '.join('%d,%d' % pair for pair in pairs)
+
+def parse_pairs(words):
+  return [tuple(int(i) for i in word.split(',')) for word in words]
+
+class ReplayWriter:
+  "Streams one game to a replay log, a line per event, flushed as it is \
+   written so that nothing is held in memory and an interrupted game still \
+   leaves a readable log."
+  def __init__(self, path, level, seed, core, tiles):
+    self.core   = core
+    self.tiles  = list(tiles)
+    self.index  = dict((id(tile), i) for i, tile in enumerate(tiles))
+    self.events = 0
+    self.fh     = open(path, 'a')
+    self.write('%s\nlevel %s %d %d' % (FORMAT, level, seed, len(tiles)))
+
+  @classmethod
+  def create(cls, root, level, seed, core, tiles):
+    "Starts a new log for a game under 'root', named after the level and time."
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+      os.makedirs(root)
+    name = '%s-%s-%d.log' % (level, time.strftime('%Y%m%d-%H%M%S'), seed)
+    return cls(os.path.join(root, name), level, seed, core, tiles)
+
+  def write(self, line):
+    self.fh.write(line + '\n')
+    self.fh.flush()
+
+  def event(self, line):
+    self.write(line)
+    self.events += 1
+    if self.events % SNAPSHOT_EVERY == 0:
+      self.snapshot()
+
+  def snapshot(self):
+    journal = self.core.journal
+    removed = 0
+    for i, tile in enumerate(self.tiles):
+      if tile not in self.core.board:
+        removed |= 1 << i
+    undone  = [(self.index[id(a)], self.index[id(b)]) for op, a, b in journal.entries[journal.cursor:]]
+    self.write('s %d %x %d | %s' % (self.events, removed, journal.cursor, format_pairs(undone)))
+
+  def move(self, ms, a, b):
+    self.event('m %d %d %d' % (ms, self.index[id(a)], self.index[id(b)]))
+
+  def undo(self, ms):
+    self.event('u %d' % ms)
+
+  def redo(self, ms):
+    self.event('r %d' % ms)
+
+  def won(self, ms):
+    self.write('w %d' % ms)
+
+  def close(self):
+    self.fh.close()
+
+def read_log(fh):
+  "Yields the records of a replay log as tuples, one per line, without \
+   reading the whole file first."
+  first = fh.readline().strip()
+  if first != FORMAT:
+    raise ValueError('not a replay log: %r' % first)
+  for line in fh:
+    words = line.split()
+    if not words:
+      continue
+    kind = words[0]
+    if kind == 'level':
+      yield ('level', words[1], int(words[2]), int(words[3]))
+    elif kind == 'm':
+      yield ('m', int(words[1]), int(words[2]), int(words[3]))
+    elif kind in ('u', 'r', 'w'):
+      yield (kind, int(words[1]))
+    elif kind == 's':
+      yield ('s', int(words[1]), int(words[2], 16), int(words[3]), parse_pairs(words[5:]))
+
+class Replay:
+  "A recorded game, ready to be re-simulated from the start or from any \
+   event: seek() restores the board from the nearest snapshot, so it only \
+   replays the events after it."
+  def __init__(self, path):
+    self.path      = path
+    self.events    = []      # ('m', ms, i, j), ('u', ms) or ('r', ms)
+    self.snapshots = []      # (events, removed bitmask, cursor, undone pairs)
+    self.won_at    = None
+    self.records   = None    # the deal as (no, x, y, z), once dealt
+    with open(path, 'r') as fh:
+      for record in read_log(fh):
+        if record[0] == 'level':
+          self.level, self.seed, self.count = record[1:]
+        elif record[0] == 's':
+          self.snapshots.append(record[1:])
+        elif record[0] == 'w':
+          self.won_at = record[1]
+        else:
+          self.events.append(record)
+
+  def __len__(self):
+    return len(self.events)
+
+  def deal(self):
+    "New tiles for the deal, in the order the log's indexes refer to. The \
+     deal is only generated once."
+    if self.records is None:
+      from game import load_level
+      tiles = load_level(self.level, rnd=True, seed=self.seed)
+      if len(tiles) != self.count:
+        raise ValueError('%s has %d tiles, the replay expects %d' % (self.level, len(tiles), self.count))
+      self.records = [(tile.tileno, tile.x, tile.y, tile.z) for tile in tiles]
+    return [Tile(*record) for record in self.records]
+
+  def done_pairs(self, n):
+    "The pairs in effect after the first n events, following only the \
+     journal's cursor (no board), as indexes."
+    entries, cursor = [], 0
+    for event in self.events[:n]:
+      if event[0] == 'm':
+        del entries[cursor:]
+        entries.append(event[2:])
+        cursor += 1
+      elif event[0] == 'u':
+        cursor = max(0, cursor - 1)
+      elif cursor < len(entries):
+        cursor += 1
+    return entries[:cursor]
+
+  def restore(self, snapshot, tiles):
+    "A GameState with the board and journal of a snapshot, built directly \
+     rather than by replaying the moves before it; None if the snapshot does \
+     not agree with the events."
+    events, removed, cursor, undone = snapshot
+    done = self.done_pairs(events)
+    if len(done) != cursor:
+      return None
+    core = GameState(board=Board(tile for i, tile in enumerate(tiles) if not (removed >> i) & 1))
+    core.start_piece_count = len(tiles)
+    for i, j in done + undone:
+      core.journal.record((REMOVE, tiles[i], tiles[j]))
+    core.journal.cursor = cursor
+    return core
+
+  def apply(self, core, tiles, event):
+    "Plays one event on 'core'. Returns whether it was a legal move."
+    if event[0] == 'm':
+      return core.remove(tiles[event[2]], tiles[event[3]])
+    if event[0] == 'u':
+      return core.undo() is not None
+    return core.redo() is not None
+
+  def seek(self, n=None):
+    "The game as it stood after the first n events (all of them by default), \
+     as (core, tiles, illegal) where illegal counts events that could not be \
+     played."
+    if n is None:
+      n = len(self.events)
+    tiles = self.deal()
+    core, start = None, 0
+    for snapshot in reversed(self.snapshots):
+      if snapshot[0] <= n:
+        core = self.restore(snapshot, tiles)
+        if core is not None:
+          start = snapshot[0]
+          break
+    if core is None:
+      core = GameState(tiles)
+
+    illegal = 0
+    for event in self.events[start:n]:
+      if not self.apply(core, tiles, event):
+        illegal += 1
+    return core, tiles, illegal
+
+  def verify(self):
+    "Re-simulates the whole game at full speed. Returns (ok, seconds, reason): \
+     ok when every move was legal and a recorded win really clears the \
+     board, and seconds as write_score recorded it, or None if not won."
+    core, tiles, illegal = self.seek()
+    if illegal:
+      return False, None, '%d illegal events' % illegal
+    if self.won_at is None:
+      return True, None, 'not finished, %d tiles left' % len(core.board)
+    if not core.is_won():
+      return False, None, 'recorded as won with %d tiles left' % len(core.board)
+    if self.events and self.events[-1][1] > self.won_at:
+      return False, None, 'won before the last move'
+    return True, int(self.won_at / 1000), 'won'
+
+class ReplayPlayer:
+  "Plays a Replay back in real time on a Game, applying each event through \
+   the same methods a player's input goes through."
+  def __init__(self, game, replay):
+    self.game   = game
+    self.replay = replay
+    self.next   = 0
+
+  def start(self):
+    self.game.replay_dir = None          # don't record the playback itself
+    self.game.playback   = True          # nor score it as the viewer's game
+    self.game.start_level(self.replay.level, seed=self.replay.seed)
+    self.tiles = self.game.dealt
+
+  def update(self, now):
+    "Applies every event that is due by 'now' (pygame ticks)."
+    game = self.game
+    while self.next < len(self.replay.events) and game.core:
+      event = self.replay.events[self.next]
+      if event[1] > game.core.elapsed(now):
+        break
+      self.next += 1
+      if event[0] == 'm':
+        game.remove_pair(self.tiles[event[2]], self.tiles[event[3]])
+      elif event[0] == 'u':
+        game.undo_move()
+      else:
+        game.redo_move()
+
+  def next_event_in(self, now):
+    "Milliseconds until the next event is due, or None when there are no more."
+    if self.next >= len(self.replay.events) or not self.game.core:
+      return None
+    return max(0, self.replay.events[self.next][1] - self.game.core.elapsed(now))
+
+def main():
+  "Usage: replay.py log... [--at EVENT] \
+   Re-simulates each replay log at full speed and checks it: every move must \
+   be legal and a recorded win must clear the board. With --at, shows the \
+   board after that many events instead. Exits with status 1 if a log fails."
+  args = sys.argv[1:]
+  at = None
+  if '--at' in args:
+    ai = args.index('--at')
+    at = int(args[ai+1])
+    del args[ai:ai+2]
+
+  failed = False
+  for path in args:
+    replay = Replay(path)
+    if at is not None:
+      core, tiles, illegal = replay.seek(at)
+      print ('%s: after %d of %d events, %d tiles left, %d pairs free, %d illegal' % \
+             (path, min(at, len(replay)), len(replay), len(core.board), len(core.legal_moves()), illegal))
+      continue
+    started = time.perf_counter()
+    ok, seconds, reason = replay.verify()
+    failed = failed or not ok
+    print ('%s: %s seed %d, %d events, %s%s (%.1f ms)' % \
+           (path, replay.level, replay.seed, len(replay), 'ok' if ok else 'FAILED', \
+            ', ' + reason + ('' if seconds is None else ' in %d seconds' % seconds), \
+            (time.perf_counter() - started) * 1000))
+  if failed:
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
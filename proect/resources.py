@@ -0,0 +1,62 @@
+import threading
+import os.path
+import pygame
+
+def load_image(path):
+  return lambda: pygame.image.load(os.path.abspath(path))
+
+def load_sound(path):
+  return lambda: pygame.mixer.Sound(os.path.abspath(path))
+
+def load_font(path, size, bold=False):
+  def load():
+    f = pygame.font.Font(os.path.abspath(path), size)
+    f.set_bold(bold)
+    return f
+  return load
+
+class Resources:
+  "Images, sounds and fonts by name, each loaded the first time it is used. \
+   preload() loads the rest on a background thread, so that assets are \
+   ready by the time they are needed without holding up the first frame."
+  def __init__(self, loaders):
+    self.loaders = loaders     # name -> function returning the asset
+    self.loaded  = {}
+    self.lock    = threading.RLock()
+    self.thread  = None
+
+  def __getitem__(self, name):
+    try:
+      return self.loaded[name]
+    except KeyError:
+      pass
+    with self.lock:
+      if name not in self.loaded:
+        self.loaded[name] = self.loaders[name]()
+      return self.loaded[name]
+
+  def __contains__(self, name):
+    return name in self.loaders
+
+  def preload(self, names=None, extra=()):
+    "Loads every asset not yet loaded (or just 'names') on a daemon thread, \
+     then calls each function in 'extra'. Assets that fail to load are left \
+     for first use, which raises the error where it can be seen."
+    if self.thread is not None:
+      return self.thread
+    names = list(self.loaders) if names is None else list(names)
+    def run():
+      for name in names:
+        try:
+          self[name]
+        except Exception:
+          pass
+      for fn in extra:
+        try:
+          fn()
+        except Exception:
+          pass
+    self.thread = threading.Thread(target=run, name='preload')
+    self.thread.daemon = True
+    self.thread.start()
+    return self.thread
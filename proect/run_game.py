@@ -1,23 +1,32 @@
 
 
+import time
+started = time.perf_counter()
+
 import argparse
 import sys
 import pygame
-import time
 import os.path
 
 from tile import *
 from game import * 
-from editor import *
+from scheduler import *
     
 def main():
+  imported = time.perf_counter()
   pygame.init()
-  screen = pygame.display.set_mode((800,600))
+  # The window can be any size; the game is laid out for 800x600 and scaled.
+  size = (800,600)
+  if '--size' in sys.argv:
+    si = sys.argv.index('--size')+1
+    size = tuple(int(n) for n in sys.argv[si].split('x'))
+  screen = pygame.display.set_mode(size, pygame.RESIZABLE)
   pygame.display.set_caption("Vanessa's Mahjong, v0.0")
   
   editor = False
   sound_on  = True
   player_name = 'Player'
+  fps = 60
   
   if len(sys.argv) > 2 and '--editor' in sys.argv:
     editor = True
@@ -31,25 +40,115 @@ def main():
     
   if '--nosound' in sys.argv:
     sound_on = False
+
+  if '--fps' in sys.argv:
+    fi = sys.argv.index('--fps')+1
+    fps = int(sys.argv[fi])
+
+  # Measure how long it takes to get the first frame on screen, then quit.
+  startup_time = '--startup-time' in sys.argv
+
+  # Play back a recorded game instead of playing, and whether to record games
+  # (to replays/, one log per game).
+  replay_path = None
+  if '--replay' in sys.argv:
+    ri = sys.argv.index('--replay')+1
+    replay_path = sys.argv[ri]
+  record = '--record' in sys.argv
+
+  # Time the hot paths, show them over the game and write them out on exit.
+  profile_path = None
+  if '--profile' in sys.argv:
+    oi = sys.argv.index('--profile')+1
+    profile_path = sys.argv[oi]
   
   
   if editor:
+    from editor import Editor
     level_arg = sys.argv[i+1]
     game = Editor(sound=sound_on, filename = level_arg)
   else:
-    game = Game(sound=sound_on, player_name=player_name)
+    game = Game(sound=sound_on, player_name=player_name, record=record)
+  game.resize(screen.get_size())
+  player = None
+  if replay_path:
+    player = ReplayPlayer(game, Replay(replay_path))
+    player.start()
+  constructed = time.perf_counter()
   
-  while True:
-    for event in pygame.event.get():
-      if event.type == pygame.QUIT:
-        return
-
-      game.handle_input(event)
-     
-    game.render(screen)
-    pygame.display.flip()
-        
-    time.sleep(.001)  
+  profiler = None
+  update = pygame.display.update
+  if profile_path:
+    from instrument import Profiler
+    profiler = Profiler()
+    profiler.instrument(game)
+    update = profiler.timed(pygame.display.update, 'display')
+
+  scheduler = FrameScheduler(fps=fps)
+  first_frame = True
+  redraw = True
+  try:
+    while True:
+      if profiler:
+        profiler.begin_frame()
+      if player:
+        player.update(pygame.time.get_ticks())
+      if redraw:
+        dirty = game.render(screen)
+        if profiler:
+          dirty = dirty + [profiler.draw_overlay(screen)]
+        if dirty:
+          update(dirty)
+        if profiler:
+          profiler.restore(screen)
+          profiler.end_frame()
+        scheduler.tick()
+
+      if first_frame:
+        first_frame = False
+        if startup_time:
+          shown = time.perf_counter()
+          print ('imports      %7.1f ms' % ((imported - started) * 1000))
+          print ('init         %7.1f ms' % ((constructed - imported) * 1000))
+          print ('first frame  %7.1f ms' % ((shown - constructed) * 1000))
+          print ('total        %7.1f ms' % ((shown - started) * 1000))
+          return
+        if not editor:
+          game.preload()
+
+      timeout = game.next_frame_in()
+      if player:
+        due = player.next_event_in(pygame.time.get_ticks())
+        if due is not None and (timeout is None or due < timeout):
+          timeout = due
+      if profiler:
+        # Keep the overlay's numbers moving while nothing else happens.
+        timeout = 500 if timeout is None else min(timeout, 500)
+
+      # Waking up with no events means the timer, a replay event or the
+      # profiler overlay is due; a replay plays on whatever arrives.
+      events = scheduler.wait(timeout)
+      redraw = not events or player is not None
+      for event in events:
+        if event.type == pygame.QUIT:
+          return
+        if event.type == pygame.VIDEORESIZE:
+          screen = pygame.display.get_surface()
+          game.resize(screen.get_size())
+          redraw = True
+          continue
+
+        if player:
+          # A replay only listens for being closed.
+          if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            return
+          continue
+        if game.handle_input(event):
+          redraw = True
+  finally:
+    if profiler:
+      profiler.dump(profile_path)
+      print ('Wrote ' + profile_path)
   return
   
 if __name__ == "__main__":
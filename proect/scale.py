@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+
+import pygame
+
+from atlas import *
+
+# The game is laid out for an 800x600 window; every coordinate in the code is
+# in this space, whatever size the window really is.
+LOGICAL_SIZE = (800, 600)
+
+# Posted when surfaces scaled in the background are ready.
+ASSETS_READY = pygame.USEREVENT + 1
+
+class Viewport:
+  "Maps logical 800x600 coordinates onto a window of another size, keeping \
+   the aspect ratio and centring the picture (bars fill the rest)."
+  def __init__(self, size):
+    self.size  = tuple(size)
+    self.scale = min(float(size[0]) / LOGICAL_SIZE[0], float(size[1]) / LOGICAL_SIZE[1])
+    self.left  = (size[0] - int(round(LOGICAL_SIZE[0] * self.scale))) // 2
+    self.top   = (size[1] - int(round(LOGICAL_SIZE[1] * self.scale))) // 2
+
+  def point(self, pos):
+    "A logical point on the window."
+    return (self.left + int(round(pos[0] * self.scale)), self.top + int(round(pos[1] * self.scale)))
+
+  def rect(self, rect):
+    "The window rect covering a logical rect. Neighbouring rects share their \
+     edges, so scaled tiles meet without gaps."
+    rect = pygame.Rect(rect)
+    left, top = self.point(rect.topleft)
+    right, bottom = self.point(rect.bottomright)
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+  def logical(self, pos):
+    "The logical point under a window position, for mouse input."
+    return (int((pos[0] - self.left) / self.scale), int((pos[1] - self.top) / self.scale))
+
+  def scale_surface(self, surf):
+    size = (max(1, int(round(surf.get_width() * self.scale))), max(1, int(round(surf.get_height() * self.scale))))
+    if surf.get_bitsize() < 24:
+      surf = surf.convert_alpha()
+    return pygame.transform.smoothscale(surf, size)
+
+class ScaledAssets:
+  "The tile faces and icons scaled once for one window size. HUD text is \
+   scaled the first time it is drawn and kept, up to 'size' surfaces."
+  def __init__(self, viewport, atlas, images, size=256):
+    self.viewport = viewport
+    self.size     = size
+    face = (max(1, int(round(TILE_W * viewport.scale))), max(1, int(round(TILE_H * viewport.scale))))
+    self.face_size = face
+    self.faces  = dict((key, pygame.transform.smoothscale(atlas.image(key), face)) for key in KEYS)
+    self.images = dict((name, viewport.scale_surface(surf)) for name, surf in images.items())
+    self.texts  = {}
+
+  def face(self, key):
+    return self.faces[key]
+
+  def image(self, name):
+    return self.images[name]
+
+  def hud(self, key, surf):
+    "The scaled version of a HUD surface, as returned by Game.hud_surface(key)."
+    if key[0] == 'icon':
+      return self.images[key[1]]
+    scaled = self.texts.get(key)
+    if scaled is None:
+      if len(self.texts) >= self.size:
+        self.texts.clear()
+      scaled = self.texts[key] = self.viewport.scale_surface(surf)
+    return scaled
+
+class Scaler:
+  "Builds ScaledAssets on one background thread, for the latest window size \
+   only: asking for a new size while a build runs supersedes it, and a \
+   finished build nobody wants any more is thrown away. ASSETS_READY is \
+   posted to wake the main loop when the wanted size is ready. The last \
+   'keep' sizes built are cached, so flipping between two sizes (or back \
+   from full screen) is instant."
+  def __init__(self, resources, names, keep=2):
+    self.resources = resources
+    self.names     = names
+    self.keep      = keep
+    self.cache     = OrderedDict()   # window size -> ScaledAssets, oldest first
+    self.cond      = threading.Condition()
+    self.wanted    = None      # viewport the game is waiting for
+    self.pending   = None      # (viewport, atlas) not yet started
+    self.thread    = None
+
+  def get(self, viewport, atlas):
+    "The assets for 'viewport' if they are cached; otherwise starts building \
+     them and returns None."
+    with self.cond:
+      assets = self.cache.get(viewport.size)
+      if assets is not None:
+        self.cache.move_to_end(viewport.size)
+        self.wanted  = None
+        self.pending = None
+        return assets
+      self.wanted  = viewport
+      self.pending = (viewport, atlas)
+      if self.thread is None:
+        self.thread = threading.Thread(target=self.run, name='scale')
+        self.thread.daemon = True
+        self.thread.start()
+      self.cond.notify()
+      return None
+
+  def cancel(self):
+    with self.cond:
+      self.wanted  = None
+      self.pending = None
+
+  def take(self, viewport):
+    "The assets for 'viewport' once they have been built, else None."
+    with self.cond:
+      assets = self.cache.get(viewport.size)
+      if assets is not None and assets.viewport is viewport:
+        return assets
+      return None
+
+  def run(self):
+    while True:
+      with self.cond:
+        while self.pending is None:
+          self.cond.wait()
+        viewport, atlas = self.pending
+        self.pending = None
+      images = dict((name, self.resources[name]) for name in self.names)
+      assets = ScaledAssets(viewport, atlas, images)
+      with self.cond:
+        if self.wanted is not viewport:
+          continue
+        self.wanted = None
+        self.cache[viewport.size] = assets
+        while len(self.cache) > self.keep:
+          self.cache.popitem(last=False)
+      pygame.event.post(pygame.event.Event(ASSETS_READY))
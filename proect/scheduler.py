@@ -0,0 +1,28 @@
+import pygame
+
+class FrameScheduler:
+  "Drives the main loop. Frames are capped at 'fps' with a pygame Clock, and \
+   between frames the loop sleeps in pygame.event.wait until either input \
+   arrives or the game says its scene will change by itself."
+  def __init__(self, fps=60):
+    self.fps = fps
+    self.clock = pygame.time.Clock()
+
+  def wait(self, timeout=None):
+    "Block until there is at least one event or 'timeout' ms have passed, \
+     then return every queued event."
+    if timeout is None:
+      event = pygame.event.wait()
+    else:
+      event = pygame.event.wait(max(1, int(timeout)))
+
+    events = []
+    if event.type != pygame.NOEVENT:
+      events.append(event)
+    return events + pygame.event.get()
+
+  def tick(self):
+    "Hold the loop back so it never runs faster than the cap."
+    if self.fps:
+      return self.clock.tick(self.fps)
+    return self.clock.tick()
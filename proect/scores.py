@@ -0,0 +1,86 @@
+import os
+import os.path
+import re
+import heapq
+
+class ScoreStore:
+  "Keeps each level's best 'keep' times in memory. A score file is read once, \
+   the first time its level is asked about, and after that reads are served \
+   from memory. New top scores are appended to the file; once it holds more \
+   than twice 'keep' entries it is rewritten with just the best ones, by \
+   writing a temp file and moving it over the old one."
+  def __init__(self, root='levels/scores/', keep=5):
+    self.root   = os.path.abspath(root)
+    self.keep   = keep
+    self.heaps  = {}     # level -> heap of (-seconds, -order, name), worst on top
+    self.counts = {}     # level -> entries currently in the file
+    self.tables = {}     # level -> sorted [(name, seconds)], rebuilt on change
+    self.order  = 0
+
+  def path(self, level):
+    return os.path.join(self.root, level)
+
+  def _push(self, level, name, seconds):
+    "Returns True if the time made it into the level's table."
+    heap = self.heaps[level]
+    self.order += 1
+    entry = (-seconds, -self.order, name)
+    if len(heap) < self.keep:
+      heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+      heapq.heapreplace(heap, entry)
+    else:
+      return False
+    self.tables.pop(level, None)
+    return True
+
+  def _load(self, level):
+    if level in self.heaps:
+      return
+    self.heaps[level] = []
+    self.counts[level] = 0
+    try:
+      with open(self.path(level), 'r') as fh:
+        text = fh.read()
+    except IOError:
+      return
+    for name, seconds in re.findall(r'[(](\w+),(\d+)[)]', text):
+      self._push(level, name, int(seconds))
+      self.counts[level] += 1
+
+  def top(self, level):
+    "The best times for a level as (name, seconds), fastest first."
+    self._load(level)
+    if level not in self.tables:
+      self.tables[level] = [(name, -seconds) for seconds, order, name in \
+                            sorted(self.heaps[level], reverse=True)]
+    return self.tables[level]
+
+  def add(self, level, name, seconds):
+    "Records a finished game. Returns True if it made the table."
+    self._load(level)
+    name = re.sub(r'\W', '_', name) or 'Player'
+    seconds = int(seconds)
+    if not self._push(level, name, seconds):
+      return False
+
+    if not os.path.isdir(self.root):
+      os.makedirs(self.root)
+    if self.counts[level] + 1 > 2 * self.keep:
+      self.compact(level)
+    else:
+      with open(self.path(level), 'a') as fh:
+        fh.write('(' + name + ',' + str(seconds) + ')')
+      self.counts[level] += 1
+    return True
+
+  def compact(self, level):
+    "Rewrites a level's score file with only its table."
+    self._load(level)
+    path = self.path(level)
+    tmppath = path + '.tmp'
+    with open(tmppath, 'w') as fh:
+      for name, seconds in self.top(level):
+        fh.write('(' + name + ',' + str(seconds) + ')')
+    os.replace(tmppath, path)
+    self.counts[level] = len(self.heaps[level])
@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import random
+import multiprocessing
+
+from tile import *
+from core import *
+from packed import *
+
+# Layouts shared by every playout of a level in this process.
+_layouts = {}
+
+def choose_random(state, rnd):
+  return rnd.choice(state.legal_moves())
+
+def choose_greedy(state, rnd):
+  "The move that leaves the most tiles free, ties broken at random."
+  best, best_free = [], -1
+  for a, b in state.legal_moves():
+    state.remove(a, b)
+    free = state.board.count_free()
+    state.undo()
+    if free > best_free:
+      best, best_free = [(a, b)], free
+    elif free == best_free:
+      best.append((a, b))
+  return rnd.choice(best)
+
+POLICIES = { 'random' : choose_random, \
+             'greedy' : choose_greedy  \
+}
+
+def playout(job):
+  "Deals a level with the given seed and plays it out with a policy. Returns \
+   (level, cleared, moves made, legal moves seen summed over every turn)."
+  from game import load_level
+
+  level, seed, policy = job
+  rnd   = random.Random(seed)
+  tiles = load_level(level, rnd=True, seed=seed)
+  if level not in _layouts:
+    _layouts[level] = Layout.from_tiles(tiles)
+  state = GameState(board=PackedBoard.from_tiles(tiles, _layouts[level]))
+  choose = POLICIES[policy]
+  choices = 0
+  while not state.is_won() and not state.is_stuck():
+    choices += len(state.legal_moves())
+    a, b = choose(state, rnd)
+    state.remove(a, b)
+  return level, state.is_won(), len(state.journal), choices
+
+def main():
+  "Usage: simulate.py [level ...] [-n PLAYOUTS] [--policy random|greedy] \
+   [--workers N] [--seed S] \
+   Plays every level (all of levels/ by default) N times without a window, \
+   spread over a process pool, and reports solve rates and throughput."
+  from catalog import LevelCatalog
+
+  args = sys.argv[1:]
+  playouts, policy, workers, seed = 100, 'random', None, 0
+  if '-n' in args:
+    ni = args.index('-n')
+    playouts = int(args[ni+1])
+    del args[ni:ni+2]
+  if '--policy' in args:
+    pi = args.index('--policy')
+    policy = args[pi+1]
+    del args[pi:pi+2]
+  if '--workers' in args:
+    wi = args.index('--workers')
+    workers = int(args[wi+1])
+    del args[wi:wi+2]
+  if '--seed' in args:
+    si = args.index('--seed')
+    seed = int(args[si+1])
+    del args[si:si+2]
+  if policy not in POLICIES:
+    print ('Unknown policy ' + policy + ', pick one of ' + ', '.join(sorted(POLICIES)))
+    return
+
+  levels = args or LevelCatalog().levels()
+  jobs = [(level, seed + i, policy) for level in levels for i in range(playouts)]
+
+  totals = {}
+  started = time.time()
+  pool = multiprocessing.Pool(workers)
+  try:
+    for level, cleared, moves, choices in pool.imap_unordered(playout, jobs, chunksize=8):
+      games, wins, made = totals.get(level, (0, 0, 0))
+      totals[level] = (games + 1, wins + cleared, made + moves)
+  finally:
+    pool.close()
+    pool.join()
+  elapsed = time.time() - started
+
+  all_moves = 0
+  for level in levels:
+    games, wins, made = totals[level]
+    all_moves += made
+    print ('%-20s %6d games  %5.1f%% cleared  %6.1f moves/game' % \
+           (level, games, 100.0 * wins / games, float(made) / games))
+  print ('%d games in %.2fs: %.0f games/s, %.0f moves/s (%s policy)' % \
+         (len(jobs), elapsed, len(jobs) / elapsed, all_moves / elapsed, policy))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,201 @@
+import sys
+import time
+import os.path
+
+from tile import *
+from board import *
+
+def build_masks(tiles):
+  "For every tile, bitmasks (over tile indexes) of the tiles that cover it \
+   and of its left and right neighbours, following the rules of \
+   Tile.is_blocked. A tile i is free in a set of remaining tiles 'rem' when \
+   rem & above[i] is empty and either rem & left[i] or rem & right[i] is."
+  index   = {}
+  columns = {}
+  for i, tile in enumerate(tiles):
+    index[(tile.x, tile.y, tile.z)] = i
+    columns.setdefault((tile.x, tile.y), []).append((tile.z, i))
+
+  above, left, right = [], [], []
+  for tile in tiles:
+    x, y, z = tile.x, tile.y, tile.z
+    a = l = r = 0
+    for dx, dy in COVER_OFFSETS:
+      for other_z, j in columns.get((x + dx, y + dy), ()):
+        if other_z > z:
+          a |= 1 << j
+    for dy in SIDE_OFFSETS:
+      j = index.get((x - 40, y + dy, z))
+      if j is not None:
+        l |= 1 << j
+      j = index.get((x + 40, y + dy, z))
+      if j is not None:
+        r |= 1 << j
+    above.append(a)
+    left.append(l)
+    right.append(r)
+  return above, left, right
+
+class SolveResult:
+  def __init__(self, solved, moves, nodes, elapsed):
+    self.solved  = solved      # True, False, or None when the budget ran out
+    self.moves   = moves       # list of (tile, tile) pairs when solved
+    self.nodes   = nodes
+    self.elapsed = elapsed
+
+  def nodes_per_second(self):
+    if self.elapsed <= 0:
+      return float(self.nodes)
+    return self.nodes / self.elapsed
+
+  def __repr__(self):
+    return '<SolveResult solved=%s moves=%d nodes=%d %.0f nodes/s>' % \
+           (self.solved, len(self.moves), self.nodes, self.nodes_per_second())
+
+class Solver:
+  "Decides whether a layout (as returned by load_level) can be cleared, with \
+   a depth-first search over the set of remaining tiles. Positions already \
+   known to be dead ends are kept in a transposition table keyed by the \
+   bitset of remaining tiles. No display is needed."
+  def __init__(self, tiles):
+    self.tiles = list(tiles)
+    self.above, self.left, self.right = build_masks(self.tiles)
+
+    self.kinds = {}
+    for i, tile in enumerate(self.tiles):
+      self.kinds[tile.tileno] = self.kinds.get(tile.tileno, 0) | (1 << i)
+
+    # How many tiles each tile holds back; removing busy tiles first finds
+    # solutions sooner.
+    self.weight = [0] * len(self.tiles)
+    for i in range(len(self.tiles)):
+      for j in bits(self.above[i] | self.left[i] | self.right[i]):
+        self.weight[j] += 1
+
+  def is_free(self, i, rem):
+    return not rem & self.above[i] and \
+           (not rem & self.left[i] or not rem & self.right[i])
+
+  def free_mask(self, rem):
+    free = 0
+    for i in bits(rem):
+      if self.is_free(i, rem):
+        free |= 1 << i
+    return free
+
+  def moves(self, rem):
+    "The pairs worth trying from 'rem', best first. Empty when 'rem' is \
+     provably stuck."
+    free = self.free_mask(rem)
+    moves = []
+    for mask in self.kinds.values():
+      left = rem & mask
+      if not left:
+        continue
+      ready = [i for i in bits(free & mask)]
+      if len(ready) >= 2 and left & ~free == 0:
+        # Every remaining tile of this kind is free: taking a pair of them
+        # can never hurt, so don't branch.
+        return [(ready[0], ready[1])]
+
+      if bin(left).count('1') == 2:
+        a, b = bits(left)
+        if self.above[a] & (1 << b) or self.above[b] & (1 << a):
+          # The last two of a kind sit on each other and can never pair.
+          return []
+
+      for n, a in enumerate(ready):
+        for b in ready[n+1:]:
+          moves.append((a, b))
+
+    moves.sort(key=lambda m: -(self.weight[m[0]] + self.weight[m[1]]))
+    return moves
+
+  def solve(self, max_nodes=None, time_limit=None):
+    started = time.time()
+    full = (1 << len(self.tiles)) - 1
+
+    for mask in self.kinds.values():
+      if bin(mask).count('1') % 2:
+        return SolveResult(False, [], 0, time.time() - started)
+    if not full:
+      return SolveResult(True, [], 0, time.time() - started)
+
+    failed = set()
+    nodes  = 1
+    path   = []
+    rems   = [full]
+    stack  = [iter(self.moves(full))]
+    while stack:
+      if (max_nodes and nodes >= max_nodes) or \
+         (time_limit and time.time() - started >= time_limit):
+        return SolveResult(None, [], nodes, time.time() - started)
+
+      try:
+        a, b = next(stack[-1])
+      except StopIteration:
+        failed.add(rems.pop())
+        stack.pop()
+        if path:
+          path.pop()
+        continue
+
+      rem = rems[-1] & ~((1 << a) | (1 << b))
+      if not rem:
+        path.append((a, b))
+        moves = [(self.tiles[a], self.tiles[b]) for a, b in path]
+        return SolveResult(True, moves, nodes, time.time() - started)
+      if rem in failed:
+        continue
+
+      nodes += 1
+      path.append((a, b))
+      rems.append(rem)
+      stack.append(iter(self.moves(rem)))
+
+    return SolveResult(False, [], nodes, time.time() - started)
+
+def solve(tiles, max_nodes=None, time_limit=None):
+  return Solver(tiles).solve(max_nodes=max_nodes, time_limit=time_limit)
+
+def main():
+  "Usage: solver.py [level ...] [--deal SEED] [--nodes N] [--time SECONDS] \
+   Checks the given levels (every file under levels/ by default). With \
+   --deal the level is dealt like in the game instead of using the files \
+   tile numbers."
+  from game import load_level
+  from catalog import LevelCatalog
+
+  args = sys.argv[1:]
+  seed, max_nodes, time_limit = None, None, 10.0
+  if '--deal' in args:
+    di = args.index('--deal')
+    seed = int(args[di+1])
+    del args[di:di+2]
+  if '--nodes' in args:
+    ni = args.index('--nodes')
+    max_nodes = int(args[ni+1])
+    del args[ni:ni+2]
+  if '--time' in args:
+    ti = args.index('--time')
+    time_limit = float(args[ti+1])
+    del args[ti:ti+2]
+
+  levels = args
+  if not levels:
+    levels = LevelCatalog().levels()
+
+  for level in levels:
+    tiles  = load_level(level, rnd=(seed is not None), seed=seed)
+    result = solve(tiles, max_nodes=max_nodes, time_limit=time_limit)
+    if result.solved:
+      status = 'solvable in %d moves' % len(result.moves)
+    elif result.solved is None:
+      status = 'undecided (budget exhausted)'
+    else:
+      status = 'NOT solvable'
+    print ('%s: %d tiles, %s, %d nodes, %.0f nodes/s' % \
+           (level, len(tiles), status, result.nodes, result.nodes_per_second()))
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,63 @@
+import os
+import random
+
+import pytest
+
+from tile import *
+from board import *
+from levelfile import *
+from catalog import *
+from deal import synthetic_layout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def shipped_levels():
+  catalog = LevelCatalog(root=os.path.join(HERE, 'levels'))
+  return [(name, [Tile(*record) for record in read_level(catalog.info(name).path)]) for name in catalog.levels()]
+
+def check_against_scalar(board, present):
+  "Board's incrementally kept free set, by number and matchable numbers, \
+   against Tile.is_blocked over the tiles on the board."
+  present = list(present)
+  free = set()
+  for tile in present:
+    blocked = bool(tile.is_blocked(present))
+    assert board.is_blocked(tile) == blocked, (tile.x, tile.y, tile.z)
+    if not blocked:
+      free.add(tile)
+
+  assert set(board.free_tiles()) == free
+  by_no = {}
+  for tile in free:
+    by_no.setdefault(tile.tileno, set()).add(tile)
+  assert dict((no, group) for no, group in board.free_by_no.items() if group) == by_no
+  assert board.matchable == set(no for no, group in by_no.items() if len(group) >= 2)
+
+@pytest.mark.parametrize('name, tiles', shipped_levels() + [('synthetic', synthetic_layout(180, seed=11))])
+def test_free_set_follows_removals_and_adds(name, tiles):
+  rnd = random.Random(name)
+  board = Board(tiles)
+  present = dict((tile, None) for tile in tiles)
+  removed = []
+  check_against_scalar(board, present)
+  for step in range(len(tiles)):
+    if removed and rnd.random() < 0.3:
+      tile = removed.pop(rnd.randrange(len(removed)))
+      board.add(tile)
+      present[tile] = None
+    elif present:
+      tile = rnd.choice(list(present))
+      board.remove(tile)
+      del present[tile]
+      removed.append(tile)
+    check_against_scalar(board, present)
+
+@pytest.mark.parametrize('name, tiles', shipped_levels())
+def test_free_set_after_clearing_and_restoring_a_level(name, tiles):
+  board = Board(tiles)
+  for tile in tiles:
+    board.remove(tile)
+  check_against_scalar(board, [])
+  for tile in reversed(tiles):
+    board.add(tile)
+  check_against_scalar(board, tiles)
@@ -0,0 +1,58 @@
+import os
+import random
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from tile import *
+from packed import *
+from levelfile import *
+from catalog import *
+from vectorized import *
+from deal import synthetic_layout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def shipped_levels():
+  catalog = LevelCatalog(root=os.path.join(HERE, 'levels'))
+  return [(name, [Tile(*record) for record in read_level(catalog.info(name).path)]) for name in catalog.levels()]
+
+def scalar_blocked(tiles):
+  return [bool(tile.is_blocked(tiles)) for tile in tiles]
+
+@pytest.mark.parametrize('name, tiles', shipped_levels())
+def test_blocked_mask_matches_scalar_on_shipped_levels(name, tiles):
+  assert tiles
+  assert [bool(b) for b in tiles_blocked_mask(tiles)] == scalar_blocked(tiles)
+
+@pytest.mark.parametrize('count', [1, 2, 133, 600])
+def test_blocked_mask_matches_scalar_on_synthetic_boards(count):
+  tiles = synthetic_layout(count, seed=count)
+  assert [bool(b) for b in tiles_blocked_mask(tiles)] == scalar_blocked(tiles)
+
+def test_blocked_mask_with_present_mask_matches_scalar():
+  rnd = random.Random(3)
+  tiles = synthetic_layout(400, seed=3)
+  present = [rnd.random() < 0.6 for tile in tiles]
+  kept = [tile for tile, here in zip(tiles, present) if here]
+  expected = dict(zip(map(id, kept), scalar_blocked(kept)))
+
+  blocked = blocked_mask([t.x for t in tiles], [t.y for t in tiles], [t.z for t in tiles], present)
+  for i, tile in enumerate(tiles):
+    if present[i]:
+      assert bool(blocked[i]) == expected[id(tile)]
+    else:
+      assert blocked[i]
+
+@pytest.mark.parametrize('name, tiles', shipped_levels() + [('synthetic', synthetic_layout(500, seed=5))])
+def test_board_blocked_mask_follows_packed_board_removals(name, tiles):
+  rnd = random.Random(7)
+  board = PackedBoard.from_tiles(tiles)
+  order = list(range(len(tiles)))
+  rnd.shuffle(order)
+  for step, i in enumerate(order[:len(order) // 2]):
+    board.remove(TileView(board, i))
+    if step % 5 == 0:
+      blocked = board_blocked_mask(board)
+      assert [bool(b) for b in blocked] == [board.is_blocked(TileView(board, j)) for j in range(len(tiles))]
@@ -0,0 +1,35 @@
+import pygame
+from collections import OrderedDict
+
+class TextCache:
+  "Keeps the most recently used rendered text surfaces, keyed by \
+   (font, text, color), so labels that never change are only rendered once."
+  def __init__(self, size=256):
+    self.size  = size
+    self.surfs = OrderedDict()
+
+  def get(self, font, text, color):
+    key = (font, text, color)
+    surf = self.surfs.get(key)
+    if surf is None:
+      surf = font.render(text, True, color)
+      self.surfs[key] = surf
+      if len(self.surfs) > self.size:
+        self.surfs.popitem(last=False)
+    else:
+      self.surfs.move_to_end(key)
+    return surf
+
+  def number(self, font, value, color):
+    "Builds a counter out of cached digit glyphs instead of rendering it, so \
+     a ticking timer never pushes the labels out of the cache."
+    glyphs = [self.get(font, digit, color) for digit in str(value)]
+    width  = sum(glyph.get_width() for glyph in glyphs)
+    height = max(glyph.get_height() for glyph in glyphs)
+
+    surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    x = 0
+    for glyph in glyphs:
+      surf.blit(glyph, (x, 0))
+      x += glyph.get_width()
+    return surf
@@ -3,34 +3,68 @@ import pygame
 import time
 import os.path
 import random
+import threading
 
-def shuffle_tiles(tiles):
-  for tile in tiles:
-    r = random.choice(range(len(tiles)))     
-    tile, tiles[r] = Tile( tiles[r].tileno, tile.x, tile.y, tile.z ), \
-                     Tile( tile.tileno, tiles[r].x, tiles[r].y, tiles[r].z )
+from atlas import *
+
+# The tile faces shared by every Tile, Game and Editor in the process.
+_atlas = None
+_atlas_lock = threading.Lock()
+
+def load_tile_atlas():
+  "Decodes the shared atlas if that has not happened yet. Safe to call from \
+   a preloading thread."
+  global _atlas
+  with _atlas_lock:
+    if _atlas is None:
+      _atlas = TileAtlas.load()
+  return _atlas
+
+def tile_atlas():
+  "Returns the shared atlas, loading it on first use and converting it to \
+   the display's pixel format as soon as there is a display."
+  atlas = _atlas or load_tile_atlas()
+  atlas.convert()
+  return atlas
+
+def tile_image(tileno):
+  "Returns the surface for a tile face (or 'template' for the blank face)."
+  return tile_atlas().image(tileno)
+
+def shuffle_tiles(tiles, rnd=random):
+  "Shuffles the tile numbers between the positions in place (Fisher-Yates)."
+  for i in range(len(tiles)-1, 0, -1):
+    r = rnd.randint(0, i)
+    tiles[i], tiles[r] = Tile( tiles[r].tileno, tiles[i].x, tiles[i].y, tiles[i].z ), \
+                         Tile( tiles[i].tileno, tiles[r].x, tiles[r].y, tiles[r].z )
 
 class Tile:
+  __slots__ = ('tileno', 'x', 'y', 'z')
+
   def __init__(self, tileno, x, y, z):
     self.tileno = tileno
-    self.imgpath    = os.path.abspath('res/tiles/' + str(self.tileno) + '.png')
-    self.img = pygame.image.load(self.imgpath)
-    
     self.x = x
     self.y = y
     self.z = z
 
-  def draw(self, screen, paused=False):
-    "Draw a tile the the screen"
+  @property
+  def img(self):
+    return tile_image(self.tileno)
+
+  def screen_rect(self):
+    "The area this tile covers on screen, offset by its height."
+    return pygame.Rect(self.x - self.z * 3, self.y - self.z * 3, 40, 60)
+
+  def draw(self, screen, paused=False, origin=(0,0)):
+    "Draw a tile the the screen, or onto a surface whose top left corner is \
+     at 'origin' on the screen"
+    atlas = tile_atlas()
+    rect = self.screen_rect().move(-origin[0], -origin[1])
     if paused == True:
-      blank = pygame.image.load( os.path.abspath('res/tiles/template.png') )
-      rect = (self.x - self.z * 3, self.y - self.z * 3, 40, 60)
-      screen.blit(blank, rect)
+      screen.blit(atlas.surface, rect, atlas.area('template'))
       return
 
-    if self.img:
-      rect = (self.x - self.z * 3, self.y - self.z * 3, 40, 60)
-      screen.blit(self.img, rect)
+    screen.blit(atlas.surface, rect, atlas.area(self.tileno))
   
   def is_blocked(self,tiles):
     "A tile can compare itself to a list of tiles to find out whether or not it's being blocked. A tile  \
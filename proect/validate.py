@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import multiprocessing
+
+from tile import *
+from levelfile import *
+from catalog import *
+from simulate import playout
+
+REPORT_VERSION = 1
+
+def rate(solve_rate):
+  "Turns the share of random playouts that clear a level into a label."
+  if solve_rate >= 0.6:
+    return 'easy'
+  if solve_rate >= 0.3:
+    return 'medium'
+  return 'hard'
+
+def check_layout(job):
+  "Structural checks on one level file, plus whether a dealt copy of it can \
+   be solved. Returns (level, tile count, errors, solvable)."
+  from game import load_level
+  from deal import generate_deal, DealError
+  from solver import solve
+
+  level, path, time_limit = job
+  records = read_level(path)
+  errors = []
+  if not records:
+    errors.append('no tiles')
+  if len(records) % 2:
+    errors.append('odd number of tiles (%d)' % len(records))
+
+  # Tiles on the same level closer than a tile's size overlap on screen.
+  cells = {}
+  for no, x, y, z in records:
+    cells.setdefault((x // 40, y // 60, z), []).append((x, y))
+  overlaps = 0
+  for (cx, cy, z), spots in cells.items():
+    for dx in (-1, 0, 1):
+      for dy in (-1, 0, 1):
+        for ox, oy in cells.get((cx + dx, cy + dy, z), ()):
+          for x, y in spots:
+            if (x, y) != (ox, oy) and abs(x - ox) < 40 and abs(y - oy) < 60:
+              overlaps += 1
+  duplicates = len(records) - len(set((x, y, z) for no, x, y, z in records))
+  if duplicates:
+    errors.append('%d tiles share a cell with another tile' % duplicates)
+  if overlaps:
+    errors.append('%d pairs of tiles overlap on the same level' % (overlaps // 2))
+
+  # The game deals with generate_deal, so that is what is checked: a layout
+  # it cannot find a clearable deal for would be dealt at random in play.
+  # A deal it did find is solved as well, as a check on the generator.
+  solvable = None
+  if records and not len(records) % 2:
+    try:
+      tiles = generate_deal(load_level(level), seed=0, strict=True)
+    except DealError as e:
+      solvable = False
+      errors.append(str(e))
+    else:
+      solvable = solve(tiles, time_limit=time_limit).solved
+      if solvable is False:
+        errors.append('no solvable deal')
+  return level, len(records), errors, solvable
+
+def load_report(path):
+  try:
+    with open(path, 'r') as fh:
+      report = json.load(fh)
+  except (IOError, ValueError):
+    return {'version': REPORT_VERSION, 'levels': {}}
+  if report.get('version') != REPORT_VERSION:
+    return {'version': REPORT_VERSION, 'levels': {}}
+  return report
+
+def validate(levels, catalog, samples=50, workers=None, force=False, time_limit=5.0):
+  "Checks and rates every level whose file changed since the cached report \
+   was written, spreading the work over a process pool. Returns the report."
+  path = catalog.ratings_path
+  report = load_report(path)
+
+  stale = []
+  for level in levels:
+    st = os.stat(catalog.info(level).path)
+    stamp = [st.st_mtime_ns, st.st_size]
+    entry = report['levels'].get(level)
+    if force or not entry or entry.get('stamp') != stamp:
+      report['levels'][level] = {'stamp': stamp}
+      stale.append(level)
+
+  if stale:
+    checks = [(level, catalog.info(level).path, time_limit) for level in stale]
+    pool = multiprocessing.Pool(workers)
+    try:
+      playable = []
+      for level, tiles, errors, solvable in pool.imap_unordered(check_layout, checks):
+        report['levels'][level].update({'tiles': tiles, 'errors': errors, 'solvable': solvable})
+        if tiles and not tiles % 2:
+          playable.append(level)
+
+      totals = {}
+      plays = [(level, seed, 'random') for level in playable for seed in range(samples)]
+      for level, cleared, moves, choices in pool.imap_unordered(playout, plays, chunksize=8):
+        games, wins, made, seen = totals.get(level, (0, 0, 0, 0))
+        totals[level] = (games + 1, wins + cleared, made + moves, seen + choices)
+    finally:
+      pool.close()
+      pool.join()
+
+    for level, (games, wins, made, seen) in totals.items():
+      solve_rate = float(wins) / games
+      report['levels'][level].update({ 'samples'    : games,                                  \
+                                       'solve_rate' : solve_rate,                             \
+                                       'branching'  : float(seen) / made if made else 0.0,    \
+                                       'difficulty' : rate(solve_rate)                        \
+      })
+
+  for level in list(report['levels']):
+    if level not in catalog.levels():
+      del report['levels'][level]
+
+  tmppath = path + '.tmp'
+  with open(tmppath, 'w') as fh:
+    json.dump(report, fh, indent=2, sort_keys=True)
+  os.replace(tmppath, path)
+  return report
+
+def main():
+  "Usage: validate.py [level ...] [-n SAMPLES] [--workers N] [--force] \
+   Validates and rates every level (all of levels/ by default) in parallel and \
+   caches the results in the report read by the level-select screen. Exits \
+   with status 1 if any level has errors."
+  args = sys.argv[1:]
+  samples, workers, force = 50, None, False
+  if '-n' in args:
+    ni = args.index('-n')
+    samples = int(args[ni+1])
+    del args[ni:ni+2]
+  if '--workers' in args:
+    wi = args.index('--workers')
+    workers = int(args[wi+1])
+    del args[wi:wi+2]
+  if '--force' in args:
+    args.remove('--force')
+    force = True
+
+  catalog = LevelCatalog()
+  levels = args or catalog.levels()
+  started = time.time()
+  report = validate(levels, catalog, samples=samples, workers=workers, force=force)
+
+  failed = False
+  for level in levels:
+    entry = report['levels'][level]
+    failed = failed or bool(entry['errors'])
+    print ('%-20s %5d tiles  %-6s  %5.1f%% cleared  branching %4.1f  %s' % \
+           (level, entry['tiles'], entry.get('difficulty', '-'), 100 * entry.get('solve_rate', 0), \
+            entry.get('branching', 0), '; '.join(entry['errors']) or 'ok'))
+  print ('%d levels in %.2fs' % (len(levels), time.time() - started))
+  if failed:
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
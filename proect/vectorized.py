@@ -0,0 +1,82 @@
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from tile import *
+from board import *
+
+# Packs a coordinate pair into one integer key; coordinates are int16.
+KEY = 1 << 16
+
+def blocking_masks(xs, ys, zs, present=None):
+  "The blocked state of every tile in one vectorized pass over coordinate \
+   columns, using the same rules as Tile.is_blocked. Returns three boolean \
+   arrays: covered (a present tile sits over it on a higher level), and \
+   has_left / has_right (a present same-level tile 40 to that side, at the \
+   same height or half a tile up or down). 'present' masks out removed tiles."
+  if numpy is None:
+    raise ImportError('vectorized.py needs numpy')
+
+  xs = numpy.asarray(xs, dtype=numpy.int64)
+  ys = numpy.asarray(ys, dtype=numpy.int64)
+  zs = numpy.asarray(zs, dtype=numpy.int64)
+  if present is None:
+    present = numpy.ones(len(xs), dtype=bool)
+  present = numpy.asarray(present, dtype=bool)
+
+  # Highest present z in every (x, y) column.
+  columns = xs * KEY + ys
+  keys, inverse = numpy.unique(columns[present], return_inverse=True)
+  tops = numpy.full(len(keys), numpy.iinfo(numpy.int64).min)
+  numpy.maximum.at(tops, inverse, zs[present])
+
+  covered = numpy.zeros(len(xs), dtype=bool)
+  if len(keys):
+    for dx, dy in COVER_OFFSETS:
+      wanted = (xs + dx) * KEY + (ys + dy)
+      at = numpy.minimum(numpy.searchsorted(keys, wanted), len(keys) - 1)
+      covered |= (keys[at] == wanted) & (tops[at] > zs)
+
+  # Same-level neighbours, looked up by (x, y, z) key.
+  cells = numpy.sort(((xs * KEY + ys) * KEY + zs)[present])
+  def occupied(dx, dy):
+    wanted = ((xs + dx) * KEY + (ys + dy)) * KEY + zs
+    if not len(cells):
+      return numpy.zeros(len(xs), dtype=bool)
+    at = numpy.minimum(numpy.searchsorted(cells, wanted), len(cells) - 1)
+    return cells[at] == wanted
+
+  has_left  = numpy.zeros(len(xs), dtype=bool)
+  has_right = numpy.zeros(len(xs), dtype=bool)
+  for dy in SIDE_OFFSETS:
+    has_left  |= occupied(-40, dy)
+    has_right |= occupied(40, dy)
+  return covered, has_left, has_right
+
+def blocked_mask(xs, ys, zs, present=None):
+  "True for every tile that cannot be removed. Removed tiles (not in \
+   'present') are reported as blocked."
+  covered, has_left, has_right = blocking_masks(xs, ys, zs, present)
+  blocked = covered | (has_left & has_right)
+  if present is not None:
+    blocked |= ~numpy.asarray(present, dtype=bool)
+  return blocked
+
+def board_blocked_mask(board):
+  "blocked_mask for a PackedBoard, indexed like its layout."
+  present = numpy.ones(len(board.layout), dtype=bool)
+  for i in bits(board.removed):
+    present[i] = False
+  return blocked_mask(board.layout.xs, board.layout.ys, board.layout.zs, present)
+
+def tiles_blocked_mask(tiles):
+  "blocked_mask for a list of tiles, in list order."
+  return blocked_mask([tile.x for tile in tiles], [tile.y for tile in tiles], [tile.z for tile in tiles])
+
+def check_against_scalar(tiles):
+  "Indexes where the vectorized answer differs from Tile.is_blocked. Empty \
+   when they agree."
+  tiles = list(tiles)
+  blocked = tiles_blocked_mask(tiles)
+  return [i for i, tile in enumerate(tiles) if bool(blocked[i]) != bool(tile.is_blocked(tiles))]